@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import array
 import collections
+import concurrent.futures
 import functools
 import logging
+import operator
 import random
 import secrets
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
-from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set as AbstractSet
+from collections.abc import (Callable, Collection, Iterable, Iterator, Mapping, MutableMapping, MutableSequence,
+                             Set as AbstractSet)
 from enum import IntEnum, IntFlag
 from typing import (Any, ClassVar, Dict, List, Literal, NamedTuple,
                     Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, overload)
@@ -101,6 +105,22 @@ class MultiWorld():
 
     random: random.Random
 
+    spheres_final: bool = False
+    """Set once item placements are final, so that the logical spheres are only computed once and then shared by
+    fulfills_accessibility, get_spheres, get_sendable_spheres and the spoiler playthrough."""
+    _sphere_results: Dict[Tuple[bool, bool], SphereResults]
+
+    sweep_workers: int = 1
+    """Number of threads that check the reachability of different players' locations concurrently while sweeping.
+    Only speeds up sweeps on free-threaded Python builds. 1 sweeps every player sequentially."""
+
+    stage_workers: int = 1
+    """Number of threads that run generate_early, create_regions, create_items and set_rules concurrently for worlds
+    that set World.concurrent_stages. Only speeds up those stages on free-threaded Python builds. 1 disables it."""
+
+    profiler: Optional["AutoWorld.GenerationProfiler"] = None
+    """Records timings of generation stages and world calls when generating with --profile."""
+
     class AttributeProxy():
         def __init__(self, rule):
             self.rule = rule
@@ -167,6 +187,7 @@ class MultiWorld():
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
+        self._sphere_results = {}
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -578,6 +599,27 @@ class MultiWorld():
 
         return False
 
+    def get_sphere_results(self, sendable: bool = False, progression: bool = False,
+                           keep_states: bool = False) -> SphereResults:
+        """
+        Returns the logical spheres of all filled locations. If sendable, the spheres only contain the multiserver
+        sendable locations (with int location addresses and item codes) and other locations are collected as soon as
+        they are reachable. If progression, only locations with advancement items are considered at all. If
+        keep_states, a copy of the state each sphere was reached with is kept as well. Once spheres_final is set, each
+        kind of result is computed only once and then shared until clear_sphere_results.
+        """
+        key = (sendable, progression)
+        results = self._sphere_results.get(key)
+        if results is None or keep_states and not results.keep_states:
+            results = SphereResults(self, sendable, progression, keep_states)
+            if self.spheres_final:
+                self._sphere_results[key] = results
+        return results
+
+    def clear_sphere_results(self) -> None:
+        """Drops the shared sphere results and their states once they are no longer needed, such as after output."""
+        self._sphere_results.clear()
+
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
@@ -586,24 +628,7 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_results().iter_spheres()
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -612,45 +637,13 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_results(sendable=True).iter_spheres()
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
         if not state:
+            if self.spheres_final:
+                return self._fulfills_accessibility_from_spheres()
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
@@ -711,12 +704,395 @@ class MultiWorld():
 
         return False
 
+    def _fulfills_accessibility_from_spheres(self) -> bool:
+        """fulfills_accessibility for a fresh state, answered from the shared sphere results."""
+        results = self.get_sphere_results()
+        state = results.state
+        players: Dict[str, Set[int]] = {
+            "minimal": set(),
+            "items": set(),
+            "full": set()
+        }
+        for player, world in self.worlds.items():
+            players[world.options.accessibility.current_key].add(player)
+
+        # filled locations are in the spheres, so only empty locations of players with full accessibility remain
+        unreachable = [location for location in results.unreachable
+                       if location.player in players["full"] or location.advancement]
+        unreachable.extend(location for location in self.get_unfilled_locations()
+                           if location.player in players["full"] and not location.can_reach(state))
+
+        if self.has_beaten_game(state) and not any(
+                location.player in players["full"] or location.item.player not in players["minimal"]
+                for location in unreachable):
+            return True
+        if unreachable:
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {unreachable}",
+                    multiworld=self,
+                )
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {unreachable}")
+        return False
+
+
+class SphereResults:
+    """
+    The logical spheres of a multiworld, computed with a single state. Each sphere only re-tests the locations that
+    something changed for: rule builder locations that only depend on items are skipped until their parent region
+    becomes reachable or one of those items changes, like blocked entrances in CollectionState, while all other
+    locations are re-tested every sphere. Like sweep_for_advancements, this assumes that collecting an item only
+    changes the state of the player it belongs to.
+    """
+    spheres: List[Set[Location]]
+    """the reachable locations of each sphere"""
+    keep_states: bool
+    states: List[CollectionState]
+    """the state that each sphere was reached with, if keep_states"""
+    unreachable: Set[Location]
+    """the locations that could not be reached at all"""
+    state: CollectionState
+    """the state after collecting every reachable location"""
+
+    def __init__(self, multiworld: MultiWorld, sendable: bool = False, progression: bool = False,
+                 keep_states: bool = False) -> None:
+        self.spheres = []
+        self.keep_states = keep_states
+        self.states = []
+        self.unreachable = set()
+        self.state = state = CollectionState(multiworld)
+        locations: Set[Location] = set()
+        events: Set[Location] = set()
+        for location in multiworld.get_filled_locations():
+            if progression and not location.item.advancement:
+                continue
+            if not sendable or type(location.item.code) is int and type(location.address) is int:
+                locations.add(location)
+            else:
+                events.add(location)
+
+        previous_items: Dict[int, Mapping[str, int]] = {}
+        previous_regions: Dict[int, Set[Region]] = {}
+
+        def collect(location: Location) -> None:
+            player = location.item.player
+            if player not in previous_items:
+                previous_items[player] = state.prog_items[player].copy()
+                previous_regions[player] = set(state.reachable_regions[player])
+            state.collect(location.item, True, location)
+
+        candidates: Iterable[Location] = locations
+        while locations:
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        collect(event)
+                        done_events.add(event)
+                events -= done_events
+
+            if self.spheres:
+                candidates = self._get_changed_candidates(state, locations, previous_items, previous_regions)
+            previous_items.clear()
+            previous_regions.clear()
+            sphere = {location for location in candidates if location.can_reach(state)}
+            if not sphere:
+                self.unreachable = locations
+                break
+
+            self.spheres.append(sphere)
+            if keep_states:
+                self.states.append(state.copy())
+            for location in sphere:
+                collect(location)
+            locations -= sphere
+
+    @staticmethod
+    def _get_changed_candidates(state: CollectionState, locations: Set[Location],
+                                previous_items: Dict[int, Mapping[str, int]],
+                                previous_regions: Dict[int, Set[Region]]) -> List[Location]:
+        """Returns the locations that may have become reachable since the previous items and regions."""
+        changed_items: Dict[int, Set[str]] = {}
+        new_regions: Dict[int, Set[Region]] = {}
+        for player, old_items in previous_items.items():
+            if state.stale[player]:
+                state.update_reachable_regions(player)
+            new_items = state.prog_items[player]
+            changed_items[player] = {item for item in old_items.keys() | new_items.keys()
+                                     if old_items[item] != new_items[item]}
+            new_regions[player] = state.reachable_regions[player] - previous_regions[player]
+
+        candidates: List[Location] = []
+        for location in locations:
+            dependencies = location.get_item_dependencies()
+            if dependencies is None:
+                candidates.append(location)
+            elif location.player in changed_items and (location.parent_region in new_regions[location.player]
+                                                      or not dependencies.isdisjoint(changed_items[location.player])):
+                candidates.append(location)
+        return candidates
+
+    def iter_spheres(self) -> Iterator[Set[Location]]:
+        """Yields each sphere, followed by an empty set and then the unreachable locations if there are any."""
+        yield from self.spheres
+        if self.unreachable:
+            yield set()
+            yield self.unreachable
+
 
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class PlayerStateDict(Dict[int, Any]):
+    """
+    Per-player CollectionState data (Counters and sets) that shares its values with the states it was copied from or
+    to. A player's value is only copied on first access, so copying a state only costs as much as the players that
+    the copy actually touches. Operations on the whole mapping, such as iteration, copy all remaining values first.
+
+    Once shared, a value is never modified, so references to a player's value should not be held across a copy.
+    """
+    __slots__ = ("pending",)
+    pending: Dict[int, Any]
+    """values of players that are still shared and have not been copied into this dict yet"""
+
+    def __init__(self, values: Mapping[int, Any] = {}, pending: Optional[Dict[int, Any]] = None) -> None:
+        super().__init__(values)
+        self.pending = {} if pending is None else pending
+
+    @classmethod
+    def share(cls, data: Dict[int, Any]) -> PlayerStateDict:
+        """Returns a copy of data that shares its values, copying eagerly if data is not a PlayerStateDict."""
+        if not isinstance(data, PlayerStateDict):
+            return cls({player: value.copy() for player, value in data.items()})
+        pending = data.pending
+        pending.update(dict.items(data))
+        dict.clear(data)
+        return cls(pending=pending.copy())
+
+    def __missing__(self, player: int) -> Any:
+        value = self.pending.pop(player).copy()
+        dict.__setitem__(self, player, value)
+        return value
+
+    def materialize(self) -> None:
+        """Copies all remaining shared values, keeping the players in ascending order."""
+        if self.pending:
+            values = dict(dict.items(self))
+            for player, value in self.pending.items():
+                values[player] = value.copy()
+            self.pending = {}
+            dict.clear(self)
+            dict.update(self, sorted(values.items()))
+
+    def __setitem__(self, player: int, value: Any) -> None:
+        self.pending.pop(player, None)
+        dict.__setitem__(self, player, value)
+
+    def __delitem__(self, player: int) -> None:
+        if self.pending.pop(player, None) is None:
+            dict.__delitem__(self, player)
+
+    def __contains__(self, player: object) -> bool:
+        return dict.__contains__(self, player) or player in self.pending
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self.pending)
+
+    def __iter__(self) -> Iterator[int]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __eq__(self, other: object) -> bool:
+        self.materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        self.materialize()
+        return dict.__ne__(self, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return dict.__repr__(self)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        self.materialize()
+        return self.__class__, (dict(self),)
+
+    def get(self, player: int, default: Any = None) -> Any:
+        return self[player] if player in self else default
+
+    def keys(self):  # type: ignore[override]
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):  # type: ignore[override]
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):  # type: ignore[override]
+        self.materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[int, Any]:  # type: ignore[override]
+        self.materialize()
+        return dict.copy(self)
+
+    def pop(self, player: int, *default: Any) -> Any:  # type: ignore[override]
+        if player in self:
+            value = self[player]
+            dict.__delitem__(self, player)
+            return value
+        return dict.pop(self, player, *default)
+
+    def popitem(self) -> Tuple[int, Any]:
+        self.materialize()
+        return dict.popitem(self)
+
+    def setdefault(self, player: int, default: Any = None) -> Any:
+        if player in self:
+            return self[player]
+        dict.__setitem__(self, player, default)
+        return default
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for player, value in dict(*args, **kwargs).items():
+            self[player] = value
+
+    def clear(self) -> None:
+        self.pending = {}
+        dict.clear(self)
+
+
+class ItemNameIndex:
+    """Interns the item names of one game to small integer indices, which ItemCounts store their counts under."""
+    __slots__ = ("names", "indices", "groups")
+    names: List[str]
+    indices: Dict[str, int]
+    groups: Dict[str, Tuple[int, ...]]
+    """indices of the items of each item name group"""
+
+    _world_indices: ClassVar[Dict[type, ItemNameIndex]] = {}
+
+    def __init__(self, item_names: Iterable[str], item_name_groups: Mapping[str, AbstractSet[str]]) -> None:
+        self.names = []
+        self.indices = {}
+        for name in item_names:
+            self.intern(name)
+        self.groups = {group: tuple(self.intern(name) for name in sorted(names))
+                       for group, names in item_name_groups.items()}
+
+    @classmethod
+    def for_world(cls, world_type: type[AutoWorld.World]) -> ItemNameIndex:
+        """Returns the index shared by all ItemCounts of a world type."""
+        index = cls._world_indices.get(world_type)
+        if index is None:
+            item_names = sorted(world_type.item_name_to_id, key=world_type.item_name_to_id.__getitem__)
+            index = cls._world_indices[world_type] = cls(item_names, world_type.item_name_groups)
+        return index
+
+    def intern(self, name: str) -> int:
+        """Returns the index of an item name, assigning the next free index to names not seen before, like events."""
+        index = self.indices.get(name)
+        if index is None:
+            index = self.indices[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+
+class ItemCounts(MutableMapping[str, int]):
+    """
+    A compact alternative to Counter[str] for CollectionState.prog_items, that stores a player's item counts in an
+    array indexed through an ItemNameIndex. Copying it is a single memory copy, and item group counts are summed over
+    precomputed indices instead of hashing each item name. Like a Counter, missing items count as 0 and deleting one
+    that's missing does nothing, but counts have to be integers and Counter arithmetic is not supported.
+    """
+    __slots__ = ("index", "counts")
+    index: ItemNameIndex
+    counts: array.array[int]
+
+    def __init__(self, index: ItemNameIndex, counts: Optional[array.array[int]] = None) -> None:
+        self.index = index
+        self.counts = array.array("i", bytes(4 * len(index.names))) if counts is None else counts
+
+    def __getitem__(self, name: str) -> int:
+        try:
+            return self.counts[self.index.indices[name]]
+        except (KeyError, IndexError):
+            return 0
+
+    def __setitem__(self, name: str, count: int) -> None:
+        index = self.index.intern(name)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend(bytes(4 * (len(self.index.names) - len(counts))))
+        counts[index] = count
+
+    def __delitem__(self, name: str) -> None:
+        index = self.index.indices.get(name)
+        if index is not None and index < len(self.counts):
+            self.counts[index] = 0
+
+    def __contains__(self, name: object) -> bool:
+        return bool(self[name])  # type: ignore[index]
+
+    def __iter__(self) -> Iterator[str]:
+        for name, count in zip(self.index.names, self.counts):
+            if count:
+                yield name
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
+
+    def copy(self) -> ItemCounts:
+        return self.__class__(self.index, self.counts[:])
+
+    def update(self, other: Union[Mapping[str, int], Iterable[str]] = (), /,  # type: ignore[override]
+               **kwargs: int) -> None:
+        """Adds counts instead of replacing them, like Counter.update."""
+        if isinstance(other, Mapping):
+            for name, count in other.items():
+                self[name] += count
+        else:
+            for name in other:
+                self[name] += 1
+        for name, count in kwargs.items():
+            self[name] += count
+
+    def subtract(self, other: Union[Mapping[str, int], Iterable[str]] = (), /, **kwargs: int) -> None:
+        """Subtracts counts, like Counter.subtract."""
+        if isinstance(other, Mapping):
+            for name, count in other.items():
+                self[name] -= count
+        else:
+            for name in other:
+                self[name] -= 1
+        for name, count in kwargs.items():
+            self[name] -= count
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def count_group(self, group: str) -> int:
+        """Returns the cumulative count of the items of an item name group."""
+        return sum(map(self.counts.__getitem__, self.index.groups[group]))
+
+    def count_group_unique(self, group: str) -> int:
+        """Returns how many of the items of an item name group have a count above 0."""
+        indices = self.index.groups[group]
+        return len(indices) - operator.countOf(map(self.counts.__getitem__, indices), 0)
+
+
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Dict[int, MutableMapping[str, int]]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
@@ -725,20 +1101,24 @@ class CollectionState():
     locations_checked: Set[Location]
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
     stale: Dict[int, bool]
+    stale_items: Dict[int, Set[str]]
+    """Item names changed per player since that player's reachable regions were last updated."""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = PlayerStateDict({player: self._new_item_counts(parent, player)
+                                           for player in parent.get_all_ids()})
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = PlayerStateDict({player: set() for player in parent.get_all_ids()})
+        self.blocked_connections = PlayerStateDict({player: set() for player in parent.get_all_ids()})
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.stale_items = PlayerStateDict({player: set() for player in parent.get_all_ids()})
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
             function(self, parent)
@@ -750,7 +1130,11 @@ class CollectionState():
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        if world.incremental_reachability:
+            queue = deque(self._get_connections_to_recheck(player, self.stale_items[player]))
+        else:
+            queue = deque(self.blocked_connections[player])
+        self.stale_items[player].clear()
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
@@ -764,6 +1148,18 @@ class CollectionState():
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def _get_connections_to_recheck(self, player: int, changed_items: AbstractSet[str]) -> List[Entrance]:
+        """
+        Filters a player's blocked connections down to those that could have been unblocked by a change to the given
+        item names. Connections with opaque access rules are always included.
+        """
+        recheck: List[Entrance] = []
+        for connection in self.blocked_connections[player]:
+            dependencies = connection.get_item_dependencies()
+            if dependencies is None or not dependencies.isdisjoint(changed_items):
+                recheck.append(connection)
+        return recheck
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -794,6 +1190,7 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        incremental = self.multiworld.worlds[player].incremental_reachability
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -815,19 +1212,37 @@ class CollectionState():
                     new_connection = True
                     self.multiworld.worlds[player].reached_region(self, new_region)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            if incremental:
+                # items don't change during the BFS, so connections that only depend on items can't be unblocked
+                queue.extend(self._get_connections_to_recheck(player, ()))
+            else:
+                queue.extend(blocked_connections)
+
+    @staticmethod
+    def _new_item_counts(multiworld: MultiWorld, player: int) -> MutableMapping[str, int]:
+        world = multiworld.worlds.get(player)
+        if world is not None and world.compact_prog_items:
+            return ItemCounts(ItemNameIndex.for_world(type(world)))
+        return Counter()
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        """
+        Creates a copy of this state. Per-player data is shared between both states until a player is first accessed
+        by either, see PlayerStateDict.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.multiworld = self.multiworld
+        ret.prog_items = PlayerStateDict.share(self.prog_items)
+        ret.reachable_regions = PlayerStateDict.share(self.reachable_regions)
+        ret.blocked_connections = PlayerStateDict.share(self.blocked_connections)
+        ret.stale_items = PlayerStateDict.share(self.stale_items)
+        ret.stale = self.stale.copy()
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -862,12 +1277,86 @@ class CollectionState():
                         "Please switch over to sweep_for_advancements.")
         return self.sweep_for_advancements(locations)
 
+    _sweep_executors: ClassVar[Dict[int, concurrent.futures.ThreadPoolExecutor]] = {}
+
+    def _partition_reachable(self, locations: List[Location]) -> Tuple[List[Location], List[Location]]:
+        """Splits locations into those that are reachable and those that are not."""
+        reachable_locations: List[Location] = []
+        unreachable_locations: List[Location] = []
+        for location in locations:
+            if location.can_reach(self):
+                reachable_locations.append(location)
+            else:
+                unreachable_locations.append(location)
+        return reachable_locations, unreachable_locations
+
+    def _sweep_for_advancements_parallel_impl(self, advancements_per_player: List[Tuple[int, List[Location]]],
+                                              yield_each_sweep: bool, workers: int) -> Iterator[None]:
+        """
+        Like _sweep_for_advancements_impl, but the reachability of each player's locations is checked concurrently
+        against the state at the start of each sweep iteration. The items found are then collected in player order, so
+        the result does not depend on thread timing.
+        """
+        executor = self._sweep_executors.get(workers)
+        if executor is None:
+            executor = self._sweep_executors[workers] = Utils.DaemonThreadPoolExecutor(workers, "Sweep")
+        all_players = {player for player, _ in advancements_per_player}
+        players_to_check = all_players
+        checking_if_finished = False
+        while players_to_check:
+            # Bring all region caches up to date first, so the concurrent checks only read region accessibility, even
+            # when a player's logic depends on another player's or an item link group's regions.
+            for player in self.multiworld.get_all_ids():
+                if self.stale[player]:
+                    self.update_reachable_regions(player)
+            # Values shared with other states are copied on first access, which would write to these dicts from the
+            # worker threads, so copy them all beforehand, including the ones added by additional_init_functions.
+            for value in vars(self).values():
+                if isinstance(value, PlayerStateDict):
+                    value.materialize()
+
+            checked = [(player, locations) for player, locations in advancements_per_player
+                       if player in players_to_check]
+            results = executor.map(self._partition_reachable, [locations for _, locations in checked])
+
+            next_advancements_per_player: List[Tuple[int, List[Location]]] = [
+                (player, locations) for player, locations in advancements_per_player if player not in players_to_check
+            ]
+            next_players_to_check = set()
+            for (player, _), (reachable_locations, unreachable_locations) in zip(checked, results):
+                if unreachable_locations:
+                    next_advancements_per_player.append((player, unreachable_locations))
+                for advancement in reachable_locations:
+                    self.advancements.add(advancement)
+                    item = advancement.item
+                    assert isinstance(item, Item), "tried to collect advancement Location with no Item"
+                    if self.collect(item, True, advancement):
+                        next_players_to_check.add(item.player)
+
+            if not next_players_to_check:
+                if not checking_if_finished:
+                    checking_if_finished = True
+                    next_players_to_check = all_players
+            else:
+                checking_if_finished = False
+
+            players_to_check = next_players_to_check
+            advancements_per_player = next_advancements_per_player
+
+            if yield_each_sweep:
+                yield
+
     def _sweep_for_advancements_impl(self, advancements_per_player: List[Tuple[int, List[Location]]],
                                      yield_each_sweep: bool) -> Iterator[None]:
         """
         The implementation for sweep_for_advancements is separated here because it returns a generator due to the use
         of a yield statement.
         """
+        workers = self.multiworld.sweep_workers
+        if workers > 1 and len(advancements_per_player) > 1:
+            yield from self._sweep_for_advancements_parallel_impl(advancements_per_player, yield_each_sweep, workers)
+            return
+
         all_players = {player for player, _ in advancements_per_player}
         players_to_check = all_players
         # As an optimization, it is assumed that each player's world only logically depends on itself. However, worlds
@@ -1079,8 +1568,10 @@ class CollectionState():
         """Returns True if the state contains at least `count` items present in a specified item group."""
         if count <= 0:
             return True
-        found: int = 0
         player_prog_items = self.prog_items[player]
+        if isinstance(player_prog_items, ItemCounts):
+            return player_prog_items.count_group(item_name_group) >= count
+        found: int = 0
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name]
             if found >= count:
@@ -1093,8 +1584,10 @@ class CollectionState():
         """
         if count <= 0:
             return True
-        found: int = 0
         player_prog_items = self.prog_items[player]
+        if isinstance(player_prog_items, ItemCounts):
+            return player_prog_items.count_group_unique(item_name_group) >= count
+        found: int = 0
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -1104,6 +1597,8 @@ class CollectionState():
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
         player_prog_items = self.prog_items[player]
+        if isinstance(player_prog_items, ItemCounts):
+            return player_prog_items.count_group(item_name_group)
         return sum(
             player_prog_items[item_name]
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1113,6 +1608,8 @@ class CollectionState():
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
         player_prog_items = self.prog_items[player]
+        if isinstance(player_prog_items, ItemCounts):
+            return player_prog_items.count_group_unique(item_name_group)
         return sum(
             player_prog_items[item_name] > 0
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1142,14 +1639,16 @@ class CollectionState():
         """
         assert count > 0
         self.prog_items[player][item] += count
+        self.stale_items[player].add(item)
 
-    def remove(self, item: Item):
+    def remove(self, item: Item) -> bool:
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
             self.stale[item.player] = True
+        return changed
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
         """
@@ -1160,6 +1659,7 @@ class CollectionState():
         :param count: How many of the item to remove.
         """
         assert count > 0
+        self.stale_items[player].add(item)
         self.prog_items[player][item] -= count
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
@@ -1173,6 +1673,7 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        self.stale_items[player].add(item)
         if count == 0:
             del (self.prog_items[player][item])
         else:
@@ -1183,6 +1684,18 @@ CollectionRule = Callable[[CollectionState], bool]
 DEFAULT_COLLECTION_RULE: CollectionRule = staticmethod(lambda state: True)
 
 
+def _get_rule_item_dependencies(rule: CollectionRule) -> Optional[AbstractSet[str]]:
+    """
+    Returns the names of the items that a rule builder rule depends on, or None if its result can depend on anything
+    else, such as for plain callables or rules that also depend on regions, locations or entrances.
+    """
+    from rule_builder.rules import Rule
+    if isinstance(rule, Rule.Resolved) and not rule.force_recalculate and not (
+            rule.region_dependencies() or rule.location_dependencies() or rule.entrance_dependencies()):
+        return frozenset(rule.item_dependencies())
+    return None
+
+
 class EntranceType(IntEnum):
     ONE_WAY = 1
     TWO_WAY = 2
@@ -1197,6 +1710,7 @@ class Entrance:
     connected_region: Optional[Region] = None
     randomization_group: int
     randomization_type: EntranceType
+    _item_dependencies: Optional[Tuple[CollectionRule, Optional[AbstractSet[str]]]] = None
 
     def __init__(self, player: int, name: str = "", parent: Optional[Region] = None,
                  randomization_group: int = 0, randomization_type: EntranceType = EntranceType.ONE_WAY) -> None:
@@ -1215,6 +1729,21 @@ class Entrance:
 
         return False
 
+    def get_item_dependencies(self) -> Optional[AbstractSet[str]]:
+        """
+        Returns the names of this entrance's player's items that its access rule depends on, or None if that can't be
+        determined, such as for plain callables or rule builder rules that also depend on regions, locations or
+        entrances. The result is cached until the access rule is replaced.
+        """
+        rule = self.access_rule
+        cached = self._item_dependencies
+        if cached is not None and cached[0] is rule:
+            return cached[1]
+
+        dependencies = _get_rule_item_dependencies(rule)
+        self._item_dependencies = (rule, dependencies)
+        return dependencies
+
     def connect(self, region: Region) -> None:
         self.connected_region = region
         region.entrances.append(self)
@@ -1491,6 +2020,7 @@ class Location:
     access_rule: CollectionRule = DEFAULT_COLLECTION_RULE
     item_rule: Callable[[Item], bool] = staticmethod(lambda item: True)
     item: Optional[Item] = None
+    _item_dependencies: Optional[Tuple[CollectionRule, Optional[AbstractSet[str]]]] = None
 
     def __init__(self, player: int, name: str = '', address: Optional[int] = None, parent: Optional[Region] = None):
         self.player = player
@@ -1513,6 +2043,22 @@ class Location:
         assert self.parent_region, f"called can_reach on a Location \"{self}\" with no parent_region"
         return self.parent_region.can_reach(state) and self.access_rule(state)
 
+    def get_item_dependencies(self) -> Optional[AbstractSet[str]]:
+        """
+        Returns the names of this location's player's items that it can be reached with besides its parent region, or
+        None if that can't be determined. See Entrance.get_item_dependencies.
+        """
+        if type(self).can_reach is not Location.can_reach or type(self.parent_region).can_reach is not Region.can_reach:
+            return None
+        rule = self.access_rule
+        cached = self._item_dependencies
+        if cached is not None and cached[0] is rule:
+            return cached[1]
+
+        dependencies = frozenset() if rule is Location.access_rule else _get_rule_item_dependencies(rule)
+        self._item_dependencies = (rule, dependencies)
+        return dependencies
+
     def place_locked_item(self, item: Item):
         if self.item:
             raise Exception(f"Location {self} already filled.")
@@ -1708,59 +2254,35 @@ class Spoiler:
         from itertools import chain
         # get locations containing progress items
         multiworld = self.multiworld
-        prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
-        collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-
-            sphere_candidates -= sphere
-            collection_spheres.append(sphere)
-            state_cache.append(state.copy())
-
-            logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere),
-                          len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+        sphere_results = multiworld.get_sphere_results(progression=True, keep_states=True)
+        state_cache: List[CollectionState] = []
+        collection_spheres: List[Set[Location]] = []
+        for sphere, sphere_state in zip(sphere_results.spheres, sphere_results.states):
+            collection_spheres.append(set(sphere))
+            state_cache.append(sphere_state)
+            logging.debug('Calculated sphere %i, containing %i progress items.', len(collection_spheres), len(sphere))
+
+        sphere_candidates = sphere_results.unreachable
+        if sphere_candidates:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if not multiworld.has_beaten_game(sphere_results.state):
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {sphere_candidates}")
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
-                else:
-                    # still required, got to keep it around
-                    required_locations.add(location)
-
             # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+            sphere.difference_update(self._cull_unrequired(state_cache[num], list(sphere), required_locations))
 
         # second phase, sphere 0
         removed_precollected: List[Item] = []
@@ -1819,6 +2341,45 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def _cull_unrequired(self, state: CollectionState, candidates: List[Location],
+                         required_locations: Set[Location]) -> List[Location]:
+        """
+        Removes the candidates that aren't required to beat the game from state from required_locations, and returns
+        them. Gives the same result as removing each candidate in turn and putting it back if the game became
+        unbeatable, but once a run of candidates turned out to be unrequired, it removes growing groups of candidates
+        at once, since a group can only be removed if each of its candidates could have been. A group that can't be
+        removed is retried one candidate at a time.
+        """
+        multiworld = self.multiworld
+        # items with many copies are the most likely to be unrequired, so trying them first gives longer runs
+        copies = Counter((location.item.player, location.item.name) for location in required_locations)
+        candidates = sorted(candidates, key=lambda location: (-copies[location.item.player, location.item.name],
+                                                              location))
+        unrequired: List[Location] = []
+        index = 0
+        size = 1
+        run = 0
+        while index < len(candidates):
+            group = candidates[index:index + size]
+            # we remove the group from required_locations to sweep from, and check if the game is still beatable
+            logging.debug('Checking if %s are required to beat the game.', ', '.join(
+                '%s (Player %d)' % (location.item.name, location.item.player) for location in group))
+            required_locations.difference_update(group)
+            if multiworld.can_beat_game(state, required_locations):
+                unrequired.extend(group)
+                index += len(group)
+                run += 1
+                if run >= 2:
+                    size *= 2
+            else:
+                # still required, got to keep it around
+                required_locations.update(group)
+                if len(group) == 1:
+                    index += 1
+                run = 0
+                size = 1
+        return unrequired
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
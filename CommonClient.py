@@ -9,6 +9,7 @@ import sys
 import typing
 import time
 import functools
+import os
 import warnings
 
 import ModuleUpdate
@@ -20,13 +21,14 @@ import Utils
 
 if __name__ == "__main__":
     Utils.init_logging("TextClient", exception_logger="Client")
+    # the text client reads data packages from the cache or server, so it doesn't need to import any world
+    os.environ.setdefault("AP_LAZY_WORLDS", "1")
 
 from MultiServer import CommandProcessor, mark_raw
 from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
                       RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType)
 from Utils import gui_enabled, Version, stream_input, async_start
-from worlds import network_data_package, AutoWorldRegister
-import os
+from worlds import network_data_package, load_data_packages, AutoWorldRegister
 import ssl
 
 if typing.TYPE_CHECKING:
@@ -434,7 +436,7 @@ class CommonContext:
         self.jsontotextparser = JSONtoTextParser(self)
         self.rawjsontotextparser = RawJSONtoTextParser(self)
         if self.game:
-            self.checksums[self.game] = network_data_package["games"][self.game]["checksum"]
+            self.checksums[self.game] = load_data_packages([self.game])[self.game]["checksum"]
         self.update_data_package(network_data_package)
 
         # execution
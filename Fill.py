@@ -35,6 +35,27 @@ def sweep_from_pool(base_state: CollectionState,
     return new_state
 
 
+def _can_fill_cached(location: Location, state: CollectionState, item: Item, check_access: bool,
+                     reachability_cache: dict[Location, bool]) -> bool:
+    """
+    `Location.can_fill`, but remembers whether each location is reachable in `state`, so that testing many items against
+    the same locations only evaluates each location's access rule once. The cache must be replaced when `state` changes.
+    Locations with custom `can_fill` or `always_allow` are checked directly.
+    """
+    if not check_access or location.always_allow is not Location.always_allow \
+            or type(location).can_fill is not Location.can_fill:
+        return location.can_fill(state, item, check_access)
+    reachable = reachability_cache.get(location)
+    if reachable is False:
+        return False
+    if (location.progress_type == LocationProgressType.EXCLUDED and (item.advancement or item.useful)) \
+            or not location.item_rule(item):
+        return False
+    if reachable is None:
+        reachable = reachability_cache[location] = location.can_reach(state)
+    return reachable
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: list[Location],
                      item_pool: list[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: Callable[[Location], None] | None = None,
@@ -61,6 +82,15 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    # `pool_state` has every item that is not placed yet collected into it. Instead of collecting the whole remaining
+    # pool again every round, placed items are removed from it and items returning to the pool are collected again.
+    pool_state = base_state.copy()
+    for item in item_pool:
+        pool_state.collect(item, True)
+    pool_state_changed = True
+    maximum_exploration_state = pool_state
+    reachability_cache: dict[Location, bool] = {}
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -77,6 +107,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if item_pool:
                 items_to_place.append(reachable_items[next_player].pop())
 
+        removal_changed_state = False
         for item in items_to_place:
             # The items added into `reachable_items` are placed starting from the end of each deque in
             # `reachable_items`, so the items being placed are more likely to be found towards the end of `item_pool`.
@@ -84,10 +115,15 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                 if pool_item is item:
                     del item_pool[-p]
                     break
+            removal_changed_state |= pool_state.remove(item)
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        if pool_state_changed or removal_changed_state:
+            maximum_exploration_state = sweep_from_pool(
+                pool_state, (), multiworld.get_filled_locations(item.player) if single_player_placement else None)
+            reachability_cache = {}
+        # Otherwise the previous state can be reused as is. Items whose removal changed the state can be collected again
+        # by the next sweep once they are placed, so that sweep can't be skipped either.
+        pool_state_changed = removal_changed_state
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
@@ -95,6 +131,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             # if we have run out of locations to fill,break out of this loop
             if not locations:
                 unplaced_items += items_to_place
+                for unplaced_item in items_to_place:
+                    pool_state_changed |= pool_state.collect(unplaced_item, True)
                 break
             item_to_place = items_to_place.pop(0)
 
@@ -112,7 +150,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
             for i, location in enumerate(locations):
                 if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
+                        and _can_fill_cached(location, maximum_exploration_state, item_to_place, perform_access_check,
+                                             reachability_cache):
                     # popping by index is faster than removing by content,
                     spot_to_fill = locations.pop(i)
                     # skipping a scan for the element
@@ -185,6 +224,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            pool_state_changed |= pool_state.collect(placed_item, True)
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -198,9 +238,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
+                        pool_state_changed |= pool_state.collect(item_to_place, True)
                         continue
                 else:
                     unplaced_items.append(item_to_place)
+                    pool_state_changed |= pool_state.collect(item_to_place, True)
                     continue
             multiworld.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
@@ -784,6 +826,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        candidate_test_count: int = 0
+        resweep_count: int = 0
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: set[Location]) -> set[Location]:
@@ -871,8 +915,14 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        # Test whether the player still reaches the threshold without each item, in pop order.
+                        # After two unneeded items in a row, test growing groups of items at once, which can only be
+                        # unneeded if each item in them would have been, and go back to single items otherwise.
+                        group_size = 1
+                        unneeded_run = 0
                         while items_to_test:
-                            testing = items_to_test.pop()
+                            testing = items_to_test[-group_size:]
+                            del items_to_test[-group_size:]
                             reducing_state = state.copy()
                             for location in itertools.chain((
                                     l for l in items_to_replace
@@ -881,15 +931,28 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                 reducing_state.collect(location.item, True, location)
 
                             reducing_state.sweep_for_advancements(locations=locations_to_test)
+                            resweep_count += 1
 
                             if multiworld.has_beaten_game(balancing_state):
-                                if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
+                                needed = not multiworld.has_beaten_game(reducing_state)
                             else:
                                 reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
                                 p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
-                                if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                                needed = p < threshold_percentages[player]
+
+                            if not needed:
+                                candidate_test_count += len(testing)
+                                unneeded_run += 1
+                                if unneeded_run >= 2:
+                                    group_size *= 2
+                            else:
+                                if len(testing) == 1:
+                                    candidate_test_count += 1
+                                    items_to_replace.append(testing[0])
+                                else:
+                                    items_to_test.extend(testing)
+                                unneeded_run = 0
+                                group_size = 1
 
                     old_moved_item_count = moved_item_count
 
@@ -936,6 +999,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
 
+        logging.info(f"Progression balancing moved {moved_item_count} items over {sphere_num - 1} spheres, "
+                     f"testing {candidate_test_count} candidate items with {resweep_count} resweeps.")
+
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
     """Swaps Items of locations. Does NOT swap flags like shop_slot or locked, but does swap event"""
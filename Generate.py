@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
 import logging
 import os
@@ -59,6 +60,11 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--player_file_workers", default=defaults.player_file_workers, type=int,
+                        help="Number of processes reading player files and rolling their options. 1 disables it.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write wall time, CPU time, peak memory and call counts per generation stage and per "
+                             "world to a json file next to the output.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -79,6 +85,24 @@ def get_seed_name(random_source) -> str:
     return f"{random_source.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits)
 
 
+class ImmediateExecutor(concurrent.futures.Executor):
+    """Runs submitted calls right away in this process, for when player files aren't handled by workers."""
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def get_player_file_executor(workers: int) -> concurrent.futures.Executor:
+    if workers > 1:
+        return concurrent.futures.ProcessPoolExecutor(workers)
+    return ImmediateExecutor()
+
+
 def main(args=None) -> tuple[argparse.Namespace, int]:
     # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
     if __name__ == "__main__" and "worlds" in sys.modules:
@@ -122,37 +146,50 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     else:
         meta_weights = None
 
+    # player files are read, and their options rolled, on worker processes if configured
+    executor = get_player_file_executor(args.player_file_workers)
+    try:
+        return roll_player_files(args, seed, seed_name, weights_cache, meta_weights, executor)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def roll_player_files(args: argparse.Namespace, seed: int, seed_name: str, weights_cache: dict[str, tuple[Any, ...]],
+                      meta_weights: dict[str, Any] | None, executor: concurrent.futures.Executor
+                      ) -> tuple[argparse.Namespace, int]:
     player_id: int = 1
     player_files: dict[int, str] = {}
     player_errors: list[str] = []
     allow_quantity = args.allow_quantity
+    read_files: dict[str, concurrent.futures.Future[tuple[Any, ...]]] = {}
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
-                    if yaml is None:
-                        logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
-                    else:
-                        quantity = yaml.get("quantity", 1)
-                        if quantity <= 0:
-                            raise ValueError("A quantity of 0 or less is invalid. Please change it to at least 1.")
-                        if not allow_quantity and quantity > 1:
-                            raise ValueError("Quantity greater than 1 is deactivated by host settings.")
-
-                        for _ in range(quantity):
-                            weights_for_file.append(yaml)
-                weights_cache[fname] = tuple(weights_for_file)
+            read_files[fname] = executor.submit(read_weights_yamls, os.path.join(args.player_files_path, fname))
+    for fname, read_file in read_files.items():
+        try:
+            weights_for_file = []
+            for doc_idx, yaml in enumerate(read_file.result()):
+                if yaml is None:
+                    logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
+                else:
+                    quantity = yaml.get("quantity", 1)
+                    if quantity <= 0:
+                        raise ValueError("A quantity of 0 or less is invalid. Please change it to at least 1.")
+                    if not allow_quantity and quantity > 1:
+                        raise ValueError("Quantity greater than 1 is deactivated by host settings.")
+
+                    for _ in range(quantity):
+                        weights_for_file.append(yaml)
+            weights_cache[fname] = tuple(weights_for_file)
 
-            except Exception as e:
-                logging.exception(f"Exception reading weights in file {fname}")
-                player_errors.append(
-                    f"{len(player_errors) + 1}. "
-                    f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
-                )
+        except Exception as e:
+            logging.exception(f"Exception reading weights in file {fname}")
+            player_errors.append(
+                f"{len(player_errors) + 1}. "
+                f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
+            )
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -188,6 +225,10 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                         f"Provide a general weights file ({args.weights_file_path}) or individual player files. "
                         f"A mix is also permitted.")
 
+    import worlds
+    # games are top level keys of the yamls, anything else isn't a game and so doesn't load anything
+    worlds.load_worlds({key for yamls in weights_cache.values() for yaml in yamls for key in yaml
+                        if isinstance(key, str)} | {key for key in meta_weights or () if isinstance(key, str)})
     from worlds.AutoWorld import AutoWorldRegister
     args.outputname = seed_name
     args.sprite = dict.fromkeys(range(1, args.multi+1), None)
@@ -216,11 +257,24 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                             else:
                                 yaml[category_name][key] = option
 
+    if args.player_file_workers > 1:
+        # rolls on workers are seeded on their own, so options don't depend on the process they're rolled in
+        roll_seeds = random.Random(random.getrandbits(64))
+
+        def submit_roll(yaml: dict[str, Any]) -> concurrent.futures.Future[argparse.Namespace]:
+            return executor.submit(roll_settings_seeded, yaml, args.plando, roll_seeds.getrandbits(64))
+    else:
+        # rolled right away in order from the random module, like they always were
+        def submit_roll(yaml: dict[str, Any]) -> concurrent.futures.Future[argparse.Namespace]:
+            return executor.submit(roll_settings, yaml, args.plando)
+
     settings_cache: dict[str, tuple[argparse.Namespace, ...] | None] = {fname: None for fname in weights_cache}
     if args.sameoptions:
-        for fname, yamls in weights_cache.items():
+        file_rolls = {fname: [submit_roll(yaml) for yaml in yamls]
+                      for fname, yamls in weights_cache.items()}
+        for fname, futures in file_rolls.items():
             try:
-                settings_cache[fname] = tuple(roll_settings(yaml, args.plando) for yaml in yamls)
+                settings_cache[fname] = tuple(future.result() for future in futures)
             except Exception as e:
                 logging.exception(f"Exception reading settings in file {fname}")
                 player_errors.append(
@@ -239,6 +293,17 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     name_counter: Counter[str] = Counter()
     args.player_options = {}
 
+    player_rolls: dict[int, concurrent.futures.Future[argparse.Namespace]] = {}
+    if not args.sameoptions:
+        # walks players the same way as assigning their options below
+        player = 1
+        while player <= args.multi:
+            path = player_path_cache[player]
+            for yaml in weights_cache[path] if path else (None,):
+                if yaml is not None:
+                    player_rolls[player] = submit_roll(yaml)
+                player += 1
+
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
@@ -253,7 +318,7 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                 # Use the cached settings object if it exists, otherwise roll settings within the try-catch
                 # Invariant: settings_cache[path] and weights_cache[path] have the same length
                 cached = settings_cache[path]
-                settings_object: argparse.Namespace = (cached[doc_index] if cached else roll_settings(yaml, args.plando))
+                settings_object: argparse.Namespace = (cached[doc_index] if cached else player_rolls[player].result())
 
                 for k, v in vars(settings_object).items():
                     if v is not None:
@@ -528,6 +593,21 @@ def handle_option(ret: argparse.Namespace, game_weights: dict, option_key: str,
         player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
 
 
+def roll_settings_seeded(weights: dict, plando_options: PlandoOptions, seed: int) -> argparse.Namespace:
+    """
+    Roll options like roll_settings, with the random module seeded for just this roll and restored afterwards.
+    Imports the games of weights first, as this may run on a worker process that hasn't loaded them.
+    """
+    import worlds
+    worlds.load_worlds({key for key in weights if isinstance(key, str)})
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return roll_settings(weights, plando_options)
+    finally:
+        random.setstate(state)
+
+
 def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.bosses):
     """
     Roll options from specified weights, usually originating from a .yaml options file.
@@ -659,6 +739,8 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 
 
 if __name__ == '__main__':
+    # only import the worlds the yamls ask for, unless AP_LAZY_WORLDS=0
+    os.environ.setdefault("AP_LAZY_WORLDS", "1")
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
     erargs, seed = main()
@@ -1,8 +1,10 @@
 import collections
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 import concurrent.futures
+import json
 import logging
 import os
+import shutil
 import tempfile
 import time
 from typing import Any
@@ -18,6 +20,7 @@ from Options import StartInventoryPool
 from Utils import __version__, output_path, restricted_dumps, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
+from worlds.AutoWorld import profile_stage
 from worlds.generic.Rules import exclusion_rules, locality_rules
 
 __all__ = ["main"]
@@ -38,6 +41,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
     multiworld.plando_options = args.plando
+    multiworld.sweep_workers = get_settings().generator.sweep_workers
+    multiworld.stage_workers = get_settings().generator.stage_workers
+    if args.profile:
+        multiworld.profiler = AutoWorld.GenerationProfiler()
     multiworld.game = args.game.copy()
     multiworld.player_name = args.name.copy()
     multiworld.sprite = args.sprite.copy()
@@ -73,7 +80,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    with profile_stage(multiworld, "generate_early"):
+        AutoWorld.call_all(multiworld, "generate_early")
 
     logger.info('')
 
@@ -109,13 +117,16 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    with profile_stage(multiworld, "create_regions"):
+        AutoWorld.call_all(multiworld, "create_regions")
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    with profile_stage(multiworld, "create_items"):
+        AutoWorld.call_all(multiworld, "create_items")
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    with profile_stage(multiworld, "set_rules"):
+        AutoWorld.call_all(multiworld, "set_rules")
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -141,8 +152,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     multiworld.plando_item_blocks = parse_planned_blocks(multiworld)
 
-    AutoWorld.call_all(multiworld, "connect_entrances")
-    AutoWorld.call_all(multiworld, "generate_basic")
+    with profile_stage(multiworld, "connect_entrances"):
+        AutoWorld.call_all(multiworld, "connect_entrances")
+    with profile_stage(multiworld, "generate_basic"):
+        AutoWorld.call_all(multiworld, "generate_basic")
 
     # remove starting inventory from pool items.
     # Because some worlds don't actually create items during create_items this has to be as late as possible.
@@ -185,37 +198,46 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
-    resolve_early_locations_for_planned(multiworld)
-    distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
-                                           for x in multiworld.plando_item_blocks[player]])
+    with profile_stage(multiworld, "plando"):
+        resolve_early_locations_for_planned(multiworld)
+        distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
+                                               for x in multiworld.plando_item_blocks[player]])
 
     logger.info('Running Pre Main Fill.')
 
-    AutoWorld.call_all(multiworld, "pre_fill")
+    with profile_stage(multiworld, "pre_fill"):
+        AutoWorld.call_all(multiworld, "pre_fill")
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with profile_stage(multiworld, "fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
-    AutoWorld.call_all(multiworld, 'post_fill')
+    with profile_stage(multiworld, "post_fill"):
+        AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with profile_stage(multiworld, "progression_balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
     logger.info("Running pre-output steps.")
 
-    AutoWorld.call_all(multiworld, "finalize_multiworld")
-    AutoWorld.call_all(multiworld, "pre_output")
+    with profile_stage(multiworld, "finalize_multiworld"):
+        AutoWorld.call_all(multiworld, "finalize_multiworld")
+    with profile_stage(multiworld, "pre_output"):
+        AutoWorld.call_all(multiworld, "pre_output")
+    multiworld.spheres_final = True
 
     # we're about to output using multithreading, so we're removing the global random state to prevent accidental use
     multiworld.random.passthrough = False
 
     if args.skip_output:
+        write_profile(multiworld, output_path(f"AP_{multiworld.seed_name}_Profile.json"))
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -223,32 +245,46 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     outfilebase = 'AP_' + multiworld.seed_name
 
     if args.spoiler_only:
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
-
-        multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        with profile_stage(multiworld, "spoiler"):
+            if args.spoiler > 1:
+                logger.info('Calculating playthrough.')
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            multiworld.clear_sphere_results()
+
+            multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        write_profile(multiworld, output_path(f"{outfilebase}_Profile.json"))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
+    generator_settings = get_settings().generator
     output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    # the archive is built next to the output files, and only moved to the output folder once complete
+    with output as temp_dir, zipfile.ZipFile(os.path.join(temp_dir, "archive.zip"), mode="w",
+                                             compression=zipfile.ZIP_DEFLATED) as zf:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+        with profile_stage(multiworld, "generate_output"), \
+                concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+            # each output task writes into its own folder, so its files can be archived as soon as it is done
+            output_file_futures: dict[concurrent.futures.Future[None], str] = {}
+
+            def submit_output(folder_name: str, output_task: Callable[..., None], *task_args: Any) -> None:
+                output_dir = os.path.join(temp_dir, folder_name)
+                os.mkdir(output_dir)
+                output_file_futures[pool.submit(output_task, *task_args, output_dir)] = output_dir
+
+            submit_output("stage", AutoWorld.call_stage, multiworld, "generate_output")
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                submit_output(str(player), AutoWorld.call_single, multiworld, "generate_output", player)
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
             AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
 
-            def write_multidata():
+            def write_multidata(output_dir: str):
                 import NetUtils
                 from NetUtils import HintStatus
                 slot_data: dict[int, Mapping[str, Any]] = {}
@@ -355,38 +391,75 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
+                serialized_multidata = zlib.compress(restricted_dumps(multidata),
+                                                     generator_settings.multidata_compress_level)
 
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
+                with open(os.path.join(output_dir, f'{outfilebase}.archipelago'), 'wb') as f:
                     f.write(bytes([3]))  # version of format
                     f.write(serialized_multidata)
 
-            output_file_futures.append(pool.submit(write_multidata))
+            submit_output("multidata", write_multidata)
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
                 else:
                     logger.warning("Location Accessibility requirements not fulfilled.")
 
-            # retrieve exceptions via .result() if they occurred.
+            # retrieve exceptions via .result() if they occurred, while archiving finished output.
             for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
+                archive_output_files(zf, output_file_futures[future], generator_settings.archive_compress_level)
 
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+        with profile_stage(multiworld, "spoiler"):
+            if args.spoiler > 1:
+                logger.info('Calculating playthrough.')
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            # the sphere results and their states can be freed now, as the multiworld is returned to the caller
+            multiworld.clear_sphere_results()
 
-        if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            if args.spoiler:
+                spoiler_dir = os.path.join(temp_dir, "spoiler")
+                os.mkdir(spoiler_dir)
+                multiworld.spoiler.to_file(os.path.join(spoiler_dir, '%s_Spoiler.txt' % outfilebase))
 
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+        with profile_stage(multiworld, "archive"):
+            if args.spoiler:
+                archive_output_files(zf, spoiler_dir, generator_settings.archive_compress_level)
+            zf.close()
+            shutil.move(zf.filename, zipfilename)
 
+    write_profile(multiworld, output_path(f"{outfilebase}_Profile.json"))
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+def is_compressed_output(path: str) -> bool:
+    """Whether an output file is compressed already, like patch containers and multidata, so deflating it is moot."""
+    return path.endswith((".archipelago", ".bsdiff4", ".zip")) or zipfile.is_zipfile(path)
+
+
+def archive_output_files(zf: zipfile.ZipFile, directory: str, compress_level: int) -> None:
+    """
+    Add the files written to directory to the output archive, storing those that are compressed already.
+    Raises FileExistsError if a file of the same name was archived before, such as from another world's output.
+    """
+    for file in os.scandir(directory):
+        if file.name in zf.NameToInfo:
+            raise FileExistsError(f"Multiple output files are named {file.name}.")
+        if is_compressed_output(file.path):
+            zf.write(file.path, arcname=file.name, compress_type=zipfile.ZIP_STORED)
+        else:
+            zf.write(file.path, arcname=file.name, compresslevel=compress_level)
+
+
+def write_profile(multiworld: MultiWorld, path: str) -> None:
+    """Write the timings recorded while generating with --profile as JSON, if any were recorded."""
+    if not multiworld.profiler:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(multiworld.profiler.to_dict(multiworld), f, indent=2)
+    logging.info(f"Wrote generation profile to {path}")
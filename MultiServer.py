@@ -2,17 +2,21 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
 import collections
 import contextlib
 import copy
 import datetime
 import functools
 import hashlib
+import hmac
+import http
 import inspect
 import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
@@ -175,6 +179,42 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+class TokenBucket:
+    """Allows rate actions per second on average, and bursts of up to capacity actions."""
+    __slots__ = ("rate", "capacity", "tokens", "last")
+
+    rate: float
+    capacity: float
+    tokens: float
+    last: float
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = now
+
+    def take(self, now: float) -> float:
+        """Take a token and return how many seconds to wait before acting on it."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate) - 1
+        self.last = now
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+# commands that are counted separately, anything else shares one count
+client_commands = frozenset({"Connect", "ConnectUpdate", "Sync", "LocationChecks", "LocationScouts", "CreateHints",
+                             "UpdateHint", "StatusUpdate", "Say", "GetDataPackage", "Bounce", "Get", "Set",
+                             "SetNotify"})
+
+
+def command_kind(msg: typing.Any) -> str:
+    """Get the command of msg if it is one of client_commands, otherwise an empty string."""
+    cmd = msg.get("cmd", None) if type(msg) is dict else None
+    return cmd if cmd in client_commands else ""
+
+
 class Client(Endpoint):
     __slots__ = (
         "__weakref__",
@@ -191,6 +231,7 @@ class Client(Endpoint):
         "no_items",
         "no_locations",
         "no_text",
+        "rate_buckets",
     )
 
     version: Version
@@ -206,6 +247,7 @@ class Client(Endpoint):
     no_items: bool
     no_locations: bool
     no_text: bool
+    rate_buckets: typing.Dict[str, TokenBucket]
 
     def __init__(self, socket: "ServerConnection", ctx: Context) -> None:
         super().__init__(socket)
@@ -222,6 +264,7 @@ class Client(Endpoint):
         self.no_items = False
         self.no_locations = False
         self.no_text = False
+        self.rate_buckets = {}
 
     @property
     def items_handling(self):
@@ -249,7 +292,6 @@ team_slot = typing.Tuple[int, int]
 
 
 class Context:
-    dumper = staticmethod(encode)
     loader = staticmethod(decode)
 
     simple_options = {"hint_cost": int,
@@ -273,6 +315,13 @@ class Context:
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_prefix_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_prefix_lengths: typing.List[int]
+    """sorted distinct lengths of the keys of stored_data_prefix_notification_clients"""
+    stored_data_keys: typing.List[str]
+    """sorted keys of stored_data, for prefix queries"""
+    stored_data_writers: typing.Dict[str, int]
+    """slot that last wrote each key of stored_data since the server started"""
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -285,6 +334,8 @@ class Context:
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    location_spheres: typing.Dict[int, typing.Dict[int, int]]
+    """ { player: { location_id: sphere, ... } }, built from spheres """
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
@@ -295,6 +346,23 @@ class Context:
         super(Context, self).__init__()
         self.slot_info = {}
         self.log_network = log_network
+        self.client_rate_limits: typing.Dict[str, float] = {}  # commands per second by cmd, others are unlimited
+        self.client_rate_burst = 4  # in seconds worth of the rate limit
+        self.client_send_buffer_limit = 16 * 1024 * 1024  # in bytes, 0 to disable
+        self.throttled_commands: typing.Counter[str] = collections.Counter()
+        self.throttled_time = 0.0
+        self.send_buffer_disconnects = 0
+        # metrics
+        self.received_commands: typing.Counter[str] = collections.Counter()
+        self.decode_time = 0.0
+        self.encode_time = 0.0
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self.save_count = 0
+        self.last_save_duration = 0.0
+        self.last_save_size = 0
+        self.metrics_enabled = False
+        self.stored_data_size = 0
         self.endpoints = []
         self.clients = {}
         self.compatibility: int = compatibility
@@ -313,6 +381,13 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.received_items_dirty: typing.Set[team_slot] = set()  # slots with items not yet sent to their clients
+        self.send_items_delay = 0.05  # in seconds, items received within are sent as one ReceivedItems
+        self.send_items_handle: typing.Optional[asyncio.TimerHandle] = None
+        # broadcasts are encoded once and then fanned out, these track the characters that saves
+        self.broadcast_count = 0
+        self.broadcast_encoded_size = 0
+        self.broadcast_sent_size = 0
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -320,6 +395,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # hints by (team, finding_player, location), kept in sync with the finding player's hints
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -339,6 +416,14 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        self.journal_filename: typing.Optional[str] = None
+        self.journal_file: typing.Optional[typing.BinaryIO] = None
+        self.journal_generation = 0
+        self.journal_min_compaction_size = 64 * 1024  # in bytes
+        self._journal_pending: typing.List[typing.Tuple[str, typing.Any, typing.Any]] = []
+        self._journal_lock = threading.RLock()
+        self._journal_flush_scheduled = False
+        self._snapshot_size = 0
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -347,9 +432,14 @@ class Context:
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
         self.stored_data = {}
-        self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.stored_data_notification_clients = {}
+        self.stored_data_prefix_notification_clients = {}
+        self.stored_data_prefix_lengths = []
+        self.stored_data_keys = []
+        self.stored_data_writers = {}
         self.read_data = {}
         self.spheres = []
+        self.location_spheres = {}
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -410,8 +500,58 @@ class Context:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
     # General networking
+    def dumper(self, obj: typing.Any) -> str:
+        start = time.perf_counter()
+        try:
+            return encode(obj)
+        finally:
+            self.encode_time += time.perf_counter() - start
+
+    def decode_msgs(self, data: str) -> typing.List[dict]:
+        start = time.perf_counter()
+        try:
+            return decode(data)
+        finally:
+            self.decode_time += time.perf_counter() - start
+
+    async def throttle(self, client: Client, msg: typing.Any) -> None:
+        """Wait until client may send another command like msg, keeping it from starving the loop for others."""
+        if not self.client_rate_limits:
+            return
+        cmd = command_kind(msg)
+        rate = self.client_rate_limits.get(cmd, 0)
+        if not rate:
+            return
+        now = time.monotonic()
+        bucket = client.rate_buckets.get(cmd, None)
+        if not bucket:
+            bucket = client.rate_buckets[cmd] = TokenBucket(rate, rate * self.client_rate_burst, now)
+        delay = bucket.take(now)
+        if delay:
+            self.throttled_commands[cmd] += 1
+            self.throttled_time += delay
+            # not reading from the socket meanwhile lets websockets and TCP push back on the client
+            await asyncio.sleep(delay)
+
+    def can_send(self, endpoint: Endpoint) -> bool:
+        """
+        Check that endpoint is open and is keeping up with outgoing messages.
+        Clients with more than client_send_buffer_limit bytes waiting for them are disconnected instead,
+        as they can reconnect to catch up with much less than was waiting.
+        """
+        socket = endpoint.socket
+        if not socket or not socket.open:
+            return False
+        if self.client_send_buffer_limit and socket.transport and \
+                socket.transport.get_write_buffer_size() > self.client_send_buffer_limit:
+            self.send_buffer_disconnects += 1
+            self.logger.warning(f"Disconnecting {socket.remote_address} for not keeping up with outgoing messages.")
+            socket.transport.abort()
+            return False
+        return True
+
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
-        if not endpoint.socket or not endpoint.socket.open:
+        if not self.can_send(endpoint):
             return False
         msg = self.dumper(msgs)
         try:
@@ -426,7 +566,7 @@ class Context:
             return True
 
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
-        if not endpoint.socket or not endpoint.socket.open:
+        if not self.can_send(endpoint):
             return False
         try:
             await endpoint.socket.send(msg)
@@ -442,8 +582,11 @@ class Context:
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
         sockets = []
         for endpoint in endpoints:
-            if endpoint.socket and endpoint.socket.open:
+            if self.can_send(endpoint):
                 sockets.append(endpoint.socket)
+        self.broadcast_count += 1
+        self.broadcast_encoded_size += len(msg)
+        self.broadcast_sent_size += len(msg) * len(sockets)
         try:
             websockets.broadcast(sockets, msg)
         except RuntimeError:
@@ -482,6 +625,58 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    async def monitor_loop_lag(self, interval: float = 1.0) -> None:
+        """Measure how late the event loop wakes up, as that is how long every client waits on top of the network."""
+        loop = asyncio.get_running_loop()
+        while not self.exit_event.is_set():
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, loop.time() - expected)
+            self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+
+    def get_metrics(self) -> str:
+        """Get metrics of this room in Prometheus text format."""
+        metrics: typing.List[str] = []
+
+        def add(name: str, metric_type: str, description: str,
+                values: typing.Iterable[typing.Tuple[str, typing.SupportsFloat]]) -> None:
+            metrics.append(f"# HELP archipelago_{name} {description}")
+            metrics.append(f"# TYPE archipelago_{name} {metric_type}")
+            metrics.extend(f"archipelago_{name}{labels} {float(value)!r}" for labels, value in values)
+
+        authenticated = sum(1 for endpoint in self.endpoints if endpoint.auth)
+        add("clients", "gauge", "Connected clients.",
+            [('{authenticated="true"}', authenticated),
+             ('{authenticated="false"}', len(self.endpoints) - authenticated)])
+        add("commands_received_total", "counter", "Commands received from clients.",
+            [(f'{{cmd="{cmd or "other"}"}}', count) for cmd, count in self.received_commands.items()])
+        add("commands_throttled_total", "counter", "Commands delayed by the client rate limit.",
+            [(f'{{cmd="{cmd or "other"}"}}', count) for cmd, count in self.throttled_commands.items()])
+        add("send_buffer_disconnects_total", "counter", "Clients disconnected for not keeping up with messages.",
+            [("", self.send_buffer_disconnects)])
+        add("decode_seconds_total", "counter", "Time spent decoding messages from clients.", [("", self.decode_time)])
+        add("encode_seconds_total", "counter", "Time spent encoding messages to clients.", [("", self.encode_time)])
+        add("broadcasts_total", "counter", "Messages encoded once for multiple clients.", [("", self.broadcast_count)])
+        add("broadcast_saved_characters_total", "counter", "Characters that broadcasts did not encode again.",
+            [("", self.broadcast_saved_size)])
+        add("event_loop_lag_seconds", "gauge", "How late the event loop last woke up.", [("", self.loop_lag)])
+        add("event_loop_lag_max_seconds", "gauge", "How late the event loop woke up at most.",
+            [("", self.max_loop_lag)])
+        add("saves_total", "counter", "Full saves written.", [("", self.save_count)])
+        add("save_duration_seconds", "gauge", "Duration of the last full save.", [("", self.last_save_duration)])
+        add("save_size_bytes", "gauge", "Size of the last full save.", [("", self.last_save_size)])
+        add("hints", "gauge", "Hints in this room.",
+            [("", sum(len(hints) for hints in self.hint_index.values()))])
+        add("datastorage_keys", "gauge", "Keys in data storage.", [("", len(self.stored_data))])
+        add("datastorage_size_bytes", "gauge", "Approximate size of data storage values at the last full save.",
+            [("", self.stored_data_size)])
+        return "\n".join(metrics) + "\n"
+
+    @property
+    def broadcast_saved_size(self) -> int:
+        """Characters of JSON that did not have to be encoded again per recipient of a broadcast."""
+        return self.broadcast_sent_size - self.broadcast_encoded_size
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
@@ -517,9 +712,23 @@ class Context:
             with open(multidatapath, 'rb') as f:
                 data = f.read()
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        decoded_obj = self.decompress(data)
+        self._load_worlds({slot_info.game for slot_info in decoded_obj["slot_info"].values()})
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
+    def _load_worlds(self, games: typing.Set[str]) -> None:
+        """
+        With AP_LAZY_WORLDS, load the data of games from the data package cache or by importing their world,
+        before their embedded data package replaces it
+        """
+        import worlds
+        new_games = games - self.gamespackage.keys()
+        for world_name, game_package in worlds.load_data_packages(new_games).items():
+            self.item_name_groups[world_name] = game_package.pop("item_name_groups")
+            self.location_name_groups[world_name] = game_package.pop("location_name_groups")
+            self.non_hintable_names[world_name] = worlds.hint_blacklists[world_name]
+
     @staticmethod
     def decompress(data: bytes) -> dict:
         format_version = data[0]
@@ -582,7 +791,8 @@ class Context:
             self.start_inventory[slot] = [NetworkItem(item_code, -2, 0) for item_code in item_codes]
 
         for slot, hints in decoded_obj["precollected_hints"].items():
-            self.hints[0, slot].update(hints)
+            for hint in hints:
+                self._add_hint(0, slot, hint)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -612,7 +822,16 @@ class Context:
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
         # sorted access spheres
-        self.spheres = decoded_obj.get("spheres", [])
+        self._load_spheres(decoded_obj.get("spheres", []))
+
+    def _load_spheres(self, spheres: typing.List[typing.Dict[int, typing.Set[int]]]) -> None:
+        self.spheres = spheres
+        self.location_spheres = {}
+        for sphere_number, sphere in enumerate(spheres):
+            for player, locations in sphere.items():
+                player_spheres = self.location_spheres.setdefault(player, {})
+                for location_id in locations:
+                    player_spheres[location_id] = sphere_number
 
     # saving
 
@@ -622,40 +841,90 @@ class Context:
                 self.save_dirty = False
                 return self._save()
 
-            self.save_dirty = True
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._flush_journal_or_mark_dirty()
+            else:
+                # write the records of all changes handled in this loop iteration at once
+                if not self._journal_flush_scheduled:
+                    self._journal_flush_scheduled = True
+                    loop.call_soon(self._flush_journal_or_mark_dirty)
             return True
 
         return False
 
+    def _flush_journal_or_mark_dirty(self) -> None:
+        self._journal_flush_scheduled = False
+        if not self._flush_journal():
+            # compact the journal into a new snapshot on the next auto save
+            self.save_dirty = True
+
     def _save(self, exit_save: bool = False) -> bool:
+        start = time.perf_counter()
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            with self._journal_lock:
+                if self.journal_filename:
+                    self.journal_generation += 1
+                # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+                encoded_save = zlib.compress(pickle.dumps(self.get_save()))
+                temp_filename = self.save_filename + ".tmp"
+                with open(temp_filename, "wb") as f:
+                    f.write(encoded_save)
+                os.replace(temp_filename, self.save_filename)
+                self._snapshot_size = len(encoded_save)
+                if self.journal_filename:
+                    self._reset_journal()
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
+            self.record_save(time.perf_counter() - start, len(encoded_save))
             return True
 
+    def record_save(self, duration: float, size: int) -> None:
+        self.save_count += 1
+        self.last_save_duration = duration
+        self.last_save_size = size
+        if self.metrics_enabled:
+            # measured when saving, instead of for every request for the metrics
+            self.stored_data_size = len(pickle.dumps(self.stored_data))
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self._load_save_file()
+            self._start_async_saving()
+
+    def _load_save_file(self) -> None:
+        """Load the snapshot and journal at save_filename and start a new journal."""
+        self.journal_filename = self.save_filename + ".journal"
+        loaded = False
+        try:
+            with open(self.save_filename, 'rb') as f:
+                save_data = restricted_loads(zlib.decompress(f.read()))
+                self.set_save(save_data)
+            loaded = True
+        except FileNotFoundError:
+            self.logger.error('No save data found, starting a new game')
+            loaded = True  # changes may have been journaled before the first snapshot
+        except Exception as e:
+            self.logger.exception(e)
+        replayed = self._replay_journal() if loaded else 0
+        if replayed:
+            self.logger.info(f"Replayed {replayed} changes from the save journal.")
+            # compact right away, so the new journal only has to hold changes made from now on
+            self._save()
+        else:
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
-            except FileNotFoundError:
-                self.logger.error('No save data found, starting a new game')
+                with self._journal_lock:
+                    self._reset_journal()
             except Exception as e:
                 self.logger.exception(e)
-            self._start_async_saving()
 
     def _start_async_saving(self, atexit_save: bool = True):
         if not self.auto_saver_thread:
@@ -706,6 +975,7 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
+            "journal_generation": self.journal_generation,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -724,7 +994,8 @@ class Context:
             raise Exception("This savegame is newer than the server.")
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
-        self.hints.update(savedata["hints"])
+        for (team, slot), hints in savedata["hints"].items():
+            self.set_hints(team, slot, hints)
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -754,11 +1025,159 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+            self.stored_data_keys = sorted(self.stored_data)
+
+        self.journal_generation = savedata.get("journal_generation", 0)
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
             f'for {sum(k[2] for k in self.received_items)} players')
 
+    # journal
+
+    def journal(self, section: str, key: typing.Any, value: typing.Any) -> None:
+        """Record a change of save data, to be appended to the journal on the next save().
+        Has to be called after the change is made, so a snapshot taken in between can't miss it.
+        Values are pickled when written, so mutable values are journaled as they are at that point."""
+        if self.journal_file:
+            with self._journal_lock:
+                self._journal_pending.append((section, key, value))
+
+    def _flush_journal(self) -> bool:
+        """Append pending journal records to the journal file.
+        Returns False if there is no journal or it has grown large enough to be compacted into a snapshot."""
+        if not self.journal_file:
+            return False
+        try:
+            with self._journal_lock:
+                if not self.journal_file:  # closed by an exit save
+                    return False
+                for record in self._journal_pending:
+                    pickle.dump(record, self.journal_file)
+                self._journal_pending.clear()
+                self.journal_file.flush()
+                return self.journal_file.tell() < max(self.journal_min_compaction_size, self._snapshot_size)
+        except Exception as e:
+            self.logger.exception(e)
+            return False
+
+    def _reset_journal(self) -> None:
+        """Start a new, empty journal for the current generation. Expects _journal_lock to be held."""
+        if self.journal_file:
+            self.journal_file.close()
+        self._journal_pending.clear()
+        self.journal_file = open(self.journal_filename, "wb")
+        pickle.dump(("generation", None, self.journal_generation), self.journal_file)
+        self.journal_file.flush()
+
+    def _replay_journal(self) -> int:
+        """Apply the records of the journal belonging to the loaded save. Returns the number of records applied."""
+        applied = 0
+        try:
+            with open(self.journal_filename, "rb") as f:
+                unpickler = Utils.RestrictedUnpickler(f)
+                section, _, generation = unpickler.load()
+                if section != "generation" or generation != self.journal_generation:
+                    return 0  # journal predates the loaded snapshot
+                while True:
+                    try:
+                        section, key, value = unpickler.load()
+                    except EOFError:
+                        break
+                    except Exception:
+                        self.logger.warning("Save journal ends in an incomplete record, ignoring it.")
+                        break
+                    self._apply_journal_record(section, key, value)
+                    applied += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.exception(e)
+        return applied
+
+    def _apply_journal_record(self, section: str, key: typing.Any, value: typing.Any) -> None:
+        if section == "received_items":
+            index, item = value
+            items = self.received_items.setdefault(key, [])
+            if len(items) == index:  # records can be journaled twice around a compaction
+                items.append(item)
+        elif section == "location_checks":
+            self.location_checks[key] |= value
+        elif section == "name_aliases":
+            if value is None:
+                self.name_aliases.pop(key, None)
+            else:
+                self.name_aliases[key] = value
+        elif section == "hints":
+            self.set_hints(*key, value)
+        elif section == "stored_data":
+            self.set_stored_data(key, value)
+        elif section in {"hints_used", "client_game_state", "group_collected"}:
+            getattr(self, section)[key] = value
+        elif section in {"client_activity_timers", "client_connection_timers"}:
+            getattr(self, section)[key] = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+        else:
+            self.logger.warning(f"Skipping unknown save journal record {section}.")
+
+    # data storage
+
+    def set_stored_data(self, key: str, value: typing.Any, slot: typing.Optional[int] = None) -> None:
+        """Set a data storage value, keeping stored_data_keys sorted. Journaling is left to the caller."""
+        if key not in self.stored_data and len(self.stored_data_keys) == len(self.stored_data):
+            bisect.insort(self.stored_data_keys, key)
+        self.stored_data[key] = value
+        if slot is not None:
+            self.stored_data_writers[key] = slot
+
+    def get_stored_data_keys(self, prefix: str) -> typing.List[str]:
+        """Get all data storage keys starting with prefix, in sorted order."""
+        if len(self.stored_data_keys) != len(self.stored_data):  # keys are never deleted, so this catches new ones
+            self.stored_data_keys = sorted(self.stored_data)
+        keys = self.stored_data_keys
+        start = bisect.bisect_left(keys, prefix)
+        end = start
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return keys[start:end]
+
+    def add_stored_data_notification(self, client: Client, keys: typing.Iterable[str],
+                                     prefixes: typing.Iterable[str] = ()) -> None:
+        for key in keys:
+            self.stored_data_notification_clients.setdefault(key, weakref.WeakSet()).add(client)
+        for prefix in prefixes:
+            if prefix not in self.stored_data_prefix_notification_clients:
+                self.stored_data_prefix_notification_clients[prefix] = weakref.WeakSet()
+                if len(prefix) not in self.stored_data_prefix_lengths:
+                    bisect.insort(self.stored_data_prefix_lengths, len(prefix))
+            self.stored_data_prefix_notification_clients[prefix].add(client)
+
+    def get_stored_data_targets(self, key: str) -> typing.Set[Client]:
+        """Get all clients that want to be notified of changes to key.
+        Prefix subscriptions are looked up by slicing key to each subscribed prefix length,
+        so this doesn't scale with the number of subscribed prefixes.
+        Subscriptions whose clients have all been garbage collected are removed on the way."""
+        targets: typing.Set[Client] = set()
+        clients = self.stored_data_notification_clients.get(key, None)
+        if clients:
+            targets.update(clients)
+        elif clients is not None:
+            del self.stored_data_notification_clients[key]
+        pruned = False
+        for length in self.stored_data_prefix_lengths:
+            if length > len(key):
+                break
+            prefix = key[:length]
+            clients = self.stored_data_prefix_notification_clients.get(prefix, None)
+            if clients:
+                targets.update(clients)
+            elif clients is not None:
+                del self.stored_data_prefix_notification_clients[prefix]
+                pruned = True
+        if pruned:
+            self.stored_data_prefix_lengths = sorted({len(prefix) for prefix in
+                                                      self.stored_data_prefix_notification_clients})
+        return targets
+
     # rest
 
     def get_hint_cost(self, slot):
@@ -772,23 +1191,31 @@ class Context:
         will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
         pair that has at least one hint modified will be added to the set.
         """
-        for hint_team, hint_slot in self.hints:
+        for hint_team, hint_slot in list(self.hints):
             if team != hint_team and team is not None:
                 continue  # Check specified team only, all if team is None
             if slot != hint_slot and slot is not None:
                 continue  # Check specified slot only, all if slot is None
-            new_hints: typing.Set[Hint] = set()
-            for hint in self.hints[hint_team, hint_slot]:
-                new_hint = hint.re_check(self, hint_team)
-                new_hints.add(new_hint)
-                if hint == new_hint:
-                    continue
-                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
-                    if changed is not None:
-                        changed.add((hint_team,player))
-                    if slot is not None and slot != player:
-                        self.replace_hint(hint_team, player, hint, new_hint)
-            self.hints[hint_team, hint_slot] = new_hints
+            for hint in list(self.hints[hint_team, hint_slot]):
+                self._recheck_hint(hint_team, hint, changed)
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the given locations of the specified team/slot,
+        such as after they have been checked. 'changed' works like in recheck_hints.
+        """
+        for location in locations:
+            for hint in list(self.hint_index.get((team, slot, location), ())):
+                self._recheck_hint(team, hint, changed)
+
+    def _recheck_hint(self, team: int, hint: Hint, changed: typing.Optional[typing.Set[team_slot]]) -> None:
+        new_hint = hint.re_check(self, team)
+        if hint == new_hint:
+            return
+        for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+            if changed is not None:
+                changed.add((team, player))
+            self.replace_hint(team, player, hint, new_hint)
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
@@ -797,13 +1224,20 @@ class Context:
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
-            raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
-                           f"Location or player may not exist.")
+            try:
+                return self.location_spheres[player][location_id]
+            except KeyError:
+                raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
+                               f"Location or player may not exist.") from None
         return -1
 
+    def get_remaining_up_to_sphere(self, team: int, slot: int, sphere: int) -> typing.List[int]:
+        """Get the sorted IDs of the unchecked locations of a slot that are in the given sphere or an earlier one.
+        Empty if spheres are not available."""
+        checked = self.location_checks[team, slot]
+        return sorted(location_id for location_id, location_sphere in self.location_spheres.get(slot, {}).items()
+                      if location_sphere <= sphere and location_id not in checked)
+
     def get_players_package(self):
         return [NetworkPlayer(t, p, self.get_aliased_name(t, p), n) for (t, p), n in self.player_names.items()]
 
@@ -859,34 +1293,55 @@ class Context:
                 # since hints are bidirectional, finding player and receiving player,
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
-                    self.hints[team, hint.finding_player].add(hint)
+                    self._add_hint(team, hint.finding_player, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
-                        self.hints[team, player].add(hint)
+                        self._add_hint(team, player, hint)
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
         for slot in new_hint_events:
+            self.journal("hints", (team, slot), self.hints[team, slot])
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
             if recipients is None or slot in recipients:
-                clients = filter(lambda c: not c.no_text, self.clients[team].get(slot, []))
+                clients = [client for client in self.clients[team].get(slot, []) if not client.no_text]
                 if not clients:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
-                for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                self.broadcast(clients, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        hints = self.hint_index.get((team, finding_player, seeked_location))
+        return next(iter(hints)) if hints else None
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
-            self.hints[team, slot].remove(old_hint)
-            self.hints[team, slot].add(new_hint)
+            self._discard_hint(team, slot, old_hint)
+            self._add_hint(team, slot, new_hint)
+            self.journal("hints", (team, slot), self.hints[team, slot])
+
+    def set_hints(self, team: int, slot: int, hints: typing.Set[Hint]) -> None:
+        """Replaces all hints of the specified team/slot."""
+        for hint in list(self.hints[team, slot]):
+            self._discard_hint(team, slot, hint)
+        for hint in hints:
+            self._add_hint(team, slot, hint)
+
+    def _add_hint(self, team: int, slot: int, hint: Hint) -> None:
+        self.hints[team, slot].add(hint)
+        if hint.finding_player == slot:
+            self.hint_index.setdefault((team, slot, hint.location), set()).add(hint)
+
+    def _discard_hint(self, team: int, slot: int, hint: Hint) -> None:
+        self.hints[team, slot].discard(hint)
+        if hint.finding_player == slot:
+            key = team, slot, hint.location
+            located = self.hint_index.get(key)
+            if located is not None:
+                located.discard(hint)
+                if not located:
+                    del self.hint_index[key]
     
     # "events"
 
@@ -909,13 +1364,13 @@ class Context:
 
     def on_changed_hints(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_targets(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_targets(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
@@ -924,9 +1379,7 @@ def update_aliases(ctx: Context, team: int):
     cmd = ctx.dumper([{"cmd": "RoomUpdate",
                        "players": ctx.get_players_package()}])
 
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+    async_start(ctx.broadcast_send_encoded_msgs(itertools.chain.from_iterable(ctx.clients[team].values()), cmd))
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -942,7 +1395,9 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         async for data in websocket:
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
-            for msg in decode(data):
+            for msg in ctx.decode_msgs(data):
+                ctx.received_commands[command_kind(msg)] += 1
+                await ctx.throttle(client, msg)
                 await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
@@ -953,6 +1408,45 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         await ctx.disconnect(client)
 
 
+metrics_content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_request_handler(ctx: Context, token: str) -> typing.Callable[..., typing.Awaitable[typing.Any]]:
+    """
+    Create a websockets process_request hook that answers plain HTTP requests for /metrics with ctx's metrics,
+    if they are authorized with "Authorization: Bearer <token>".
+    websockets.asyncio.server calls it with (connection, request), the legacy server with (path, headers).
+
+    The metrics are served on the room's own port instead of a separate local one, as WebHost rooms pick their port
+    from GAME_PORTS when they start and only report that one. Since that port is public, a token is required.
+    """
+    expected_authorization = f"Bearer {token}".encode("utf-8")
+
+    def is_authorized(headers: typing.Any) -> bool:
+        return hmac.compare_digest(headers.get("Authorization", "").encode("utf-8"), expected_authorization)
+
+    async def process_request(connection: typing.Any, request: typing.Any) -> typing.Any:
+        if isinstance(connection, str):  # legacy server
+            if connection != "/metrics":
+                return None  # continue with the websocket handshake
+            if not is_authorized(request):
+                return http.HTTPStatus.UNAUTHORIZED, [("WWW-Authenticate", "Bearer")], b""
+            return (http.HTTPStatus.OK, [("Content-Type", metrics_content_type)],
+                    ctx.get_metrics().encode("utf-8"))
+        if request.path != "/metrics":
+            return None  # continue with the websocket handshake
+        if not is_authorized(request.headers):
+            response = connection.respond(http.HTTPStatus.UNAUTHORIZED, "")
+            response.headers["WWW-Authenticate"] = "Bearer"
+            return response
+        response = connection.respond(http.HTTPStatus.OK, ctx.get_metrics())
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = metrics_content_type
+        return response
+
+    return process_request
+
+
 async def on_client_connected(ctx: Context, client: Client):
     games = {ctx.games[x] for x in range(1, len(ctx.games) + 1)}
     games.add("Archipelago")
@@ -1018,13 +1512,13 @@ async def on_client_joined(ctx: Context, client: Client):
         ctx.notify_client(client, "Warning: your client does not support compressed websocket connections! "
                                   "It may stop working in the future. If you are a player, please report this to the "
                                   "client's developer.")
-    ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    set_connection_timer(ctx, client.team, client.slot)
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
-        ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        set_connection_timer(ctx, client.team, client.slot)
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -1041,6 +1535,13 @@ async def on_client_left(ctx: Context, client: Client):
         {"type": "Part", "team": client.team, "slot": client.slot})
 
 
+def set_connection_timer(ctx: Context, team: int, slot: int):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    ctx.client_connection_timers[team, slot] = now
+    ctx.journal("client_connection_timers", (team, slot), now.timestamp())
+    ctx.save()
+
+
 async def countdown(ctx: Context, timer: int):
     ctx.broadcast_text_all(f"[Server]: Starting countdown of {timer}s", {"type": "Countdown", "countdown": timer})
     if ctx.countdown_timer:
@@ -1102,21 +1603,43 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
     return ctx.start_inventory.setdefault(player, []) if remote_start_inventory else []
 
 
+def append_received_item(ctx: Context, team: int, slot: int, remote_items: bool, item: NetworkItem):
+    received_items = get_received_items(ctx, team, slot, remote_items)
+    received_items.append(item)
+    ctx.journal("received_items", (team, slot, remote_items), (len(received_items) - 1, item))
+    ctx.received_items_dirty.add((team, slot))
+
+
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Schedule sending newly received items to the clients of the slots that received them.
+    Items received until then are coalesced into one ReceivedItems per client."""
+    if ctx.send_items_handle or not ctx.received_items_dirty:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # not on the event loop, nothing to coalesce with
+        _send_dirty_items(ctx)
+    else:
+        ctx.send_items_handle = loop.call_later(ctx.send_items_delay, _send_dirty_items, ctx)
+
+
+def _send_dirty_items(ctx: Context):
+    ctx.send_items_handle = None
+    dirty_slots = ctx.received_items_dirty
+    ctx.received_items_dirty = set()
+    for team, slot in dirty_slots:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1150,6 +1673,7 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.journal("group_collected", group, group_collected_players)
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1162,8 +1686,8 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
     for target in ctx.slot_set(target_slot):
         for item in items:
             if item.player != target_slot:
-                get_received_items(ctx, team, target, False).append(item)
-            get_received_items(ctx, team, target, True).append(item)
+                append_received_item(ctx, team, target, False, item)
+            append_received_item(ctx, team, target, True, item)
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1173,7 +1697,9 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
     if new_locations:
         if count_activity:
-            ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            ctx.client_activity_timers[team, slot] = now
+            ctx.journal("client_activity_timers", (team, slot), now.timestamp())
 
         sortable: list[tuple[int, int, int, int]] = []
         for location in new_locations:
@@ -1201,6 +1727,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.journal("location_checks", (team, slot), new_locations)
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1208,7 +1735,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1685,12 +2212,14 @@ class ClientMessageProcessor(CommonCommandProcessor):
         if alias_name:
             alias_name = alias_name[:16].strip()
             self.ctx.name_aliases[self.client.team, self.client.slot] = alias_name
+            self.ctx.journal("name_aliases", (self.client.team, self.client.slot), alias_name)
             self.output(f"Hello, {alias_name}")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
             return True
         elif (self.client.team, self.client.slot) in self.ctx.name_aliases:
             del (self.ctx.name_aliases[self.client.team, self.client.slot])
+            self.ctx.journal("name_aliases", (self.client.team, self.client.slot), None)
             self.output("Removed Alias")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
@@ -1708,8 +2237,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
             )
             if usable:
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
-                get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
-                get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                append_received_item(self.ctx, self.client.team, self.client.slot, False, new_item)
+                append_received_item(self.ctx, self.client.team, self.client.slot, True, new_item)
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1729,7 +2258,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
         if not input_text:
             hints = {hint.re_check(self.ctx, self.client.team) for hint in
                      self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            self.ctx.set_hints(self.client.team, self.client.slot, hints)
+            self.ctx.journal("hints", (self.client.team, self.client.slot), hints)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1807,6 +2337,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     can_pay = 1000
 
                 self.ctx.random.shuffle(not_found_hints)
+                self.ctx.save_dirty = True  # random_state is only stored in snapshots
                 # By popular vote, make hints prefer non-local placements
                 not_found_hints.sort(key=lambda hint: int(hint.receiving_player != hint.finding_player))
                 # By another popular vote, prefer early sphere
@@ -1822,6 +2353,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     can_pay -= 1
                     self.ctx.hints_used[self.client.team, self.client.slot] += 1
 
+                self.ctx.journal("hints_used", (self.client.team, self.client.slot),
+                                 self.ctx.hints_used[self.client.team, self.client.slot])
                 self.ctx.notify_hints(self.client.team, hints)
                 if not_found_hints:
                     points_available = get_client_points(self.ctx, self.client)
@@ -2230,31 +2763,34 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             boolean_operator = args.get("operator", "legacy")
 
             if boolean_operator == "legacy":
-                for bounce_client in ctx.endpoints:
-                    if bounce_target.matches_client_legacy(bounce_client):
-                        await ctx.send_encoded_msgs(bounce_client, msg)
+                await ctx.broadcast_send_encoded_msgs(
+                    (bounce_client for bounce_client in ctx.endpoints
+                     if bounce_target.matches_client_legacy(bounce_client)), msg)
             elif boolean_operator in OPERATOR_NAME_TO_OPERATOR:
                 op = OPERATOR_NAME_TO_OPERATOR[boolean_operator]
-                for bounce_client in ctx.endpoints:
-                    if bounce_target.matches_client_operator(bounce_client, op):
-                        await ctx.send_encoded_msgs(bounce_client, msg)
+                await ctx.broadcast_send_encoded_msgs(
+                    (bounce_client for bounce_client in ctx.endpoints
+                     if bounce_target.matches_client_operator(bounce_client, op)), msg)
             else:
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": "Bounce", "original_cmd": cmd}])
                 return
 
         elif cmd == "Get":
-            if "keys" not in args or type(args["keys"]) != list:
+            if not valid_data_storage_keys(args):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'Retrieve', "original_cmd": cmd}])
                 return
             args["cmd"] = "Retrieved"
-            keys = args["keys"]
+            keys = args.get("keys", [])
             args["keys"] = {
                 key: ctx.read_data.get(key[6:], lambda: None)() if key.startswith("_read_") else
                      ctx.stored_data.get(key, None)
                 for key in keys
             }
+            for prefix in args.get("prefixes", ()):
+                for key in ctx.get_stored_data_keys(prefix):
+                    args["keys"][key] = ctx.stored_data[key]
             await ctx.send_msgs(client, [args])
 
         elif cmd == "Set":
@@ -2270,8 +2806,10 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
+            args["value"] = value
+            ctx.set_stored_data(args["key"], value, client.slot)
+            ctx.journal("stored_data", args["key"], value)
+            targets = ctx.get_stored_data_targets(args["key"])
             if args.get("want_reply", False):
                 targets.add(client)
             if targets:
@@ -2279,12 +2817,22 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             ctx.save()
 
         elif cmd == "SetNotify":
-            if "keys" not in args or type(args["keys"]) != list:
+            if not valid_data_storage_keys(args):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
-            for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+            ctx.add_stored_data_notification(client, args.get("keys", ()), args.get("prefixes", ()))
+
+
+def valid_data_storage_keys(args: dict) -> bool:
+    """Check the keys and prefixes arguments of Get and SetNotify, at least one of which has to be present.
+    The empty prefix is rejected, as it would match the entire data storage."""
+    if "keys" not in args and "prefixes" not in args:
+        return False
+    if type(args.get("keys", [])) != list:
+        return False
+    prefixes = args.get("prefixes", [])
+    return type(prefixes) == list and all(type(prefix) == str and prefix for prefix in prefixes)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2299,6 +2847,7 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.journal("client_game_state", (client.team, client.slot), new_status)
         ctx.on_client_status_change(client.team, client.slot)
         ctx.save()
 
@@ -2358,12 +2907,14 @@ class ServerCommandProcessor(CommonCommandProcessor):
                     if alias_name:
                         alias_name = alias_name.strip()[:15]
                         self.ctx.name_aliases[team, slot] = alias_name
+                        self.ctx.journal("name_aliases", (team, slot), alias_name)
                         self.output(f"Named {player_name} as {alias_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
                         return True
                     else:
                         del (self.ctx.name_aliases[team, slot])
+                        self.ctx.journal("name_aliases", (team, slot), None)
                         self.output(f"Removed Alias for {player_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
@@ -2428,6 +2979,33 @@ class ServerCommandProcessor(CommonCommandProcessor):
         self.output(f"Could not find player {player_name} to release")
         return False
 
+    def _cmd_missing_up_to_sphere(self, player_name: str, sphere: str) -> bool:
+        """List the missing location checks of a player that are in the given playthrough sphere or an earlier one,
+        e.g. to find out why a player is stuck."""
+        if not self.ctx.spheres:
+            self.output("Spheres are not available for this multiworld.")
+            return False
+        try:
+            sphere_number = int(sphere, 10)
+        except ValueError:
+            self.output(f"{sphere} is not a sphere number.")
+            return False
+        player = self.resolve_player(player_name)
+        if not player:
+            self.output(f"Could not find player {player_name}")
+            return False
+        team, slot, name = player
+        locations = self.ctx.get_remaining_up_to_sphere(team, slot, sphere_number)
+        if locations:
+            game = self.ctx.games[slot]
+            texts = [f"Missing: {self.ctx.location_names[game][location]} "
+                     f"(sphere {self.ctx.get_sphere(slot, location)})" for location in locations]
+            texts.append(f"Found {len(locations)} missing location checks of {name} up to sphere {sphere_number}.")
+            self.output("\n".join(texts))
+        else:
+            self.output(f"No missing location checks of {name} found up to sphere {sphere_number}.")
+        return True
+
     @mark_raw
     def _cmd_allow_release(self, player_name: str) -> bool:
         """Allow the specified player to use the !release command."""
@@ -2621,6 +3199,7 @@ class ServerCommandProcessor(CommonCommandProcessor):
                 return False
 
         setattr(self.ctx, option_name, value_type(option_value))
+        self.ctx.save_dirty = True  # game_options are only stored in snapshots
         self.output(f"Set option {option_name} to {getattr(self.ctx, option_name)}")
         if option_name in {"release_mode", "remaining_mode", "collect_mode"}:
             self.ctx.broadcast_all([{"cmd": "RoomUpdate", 'permissions': get_permissions(self.ctx)}])
@@ -2638,13 +3217,37 @@ class ServerCommandProcessor(CommonCommandProcessor):
     def _cmd_datastore(self):
         """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
         total: int = 0
+        slot_totals: typing.Counter[typing.Optional[int]] = collections.Counter()
         texts = []
         for key, value in self.ctx.stored_data.items():
             size = len(pickle.dumps(value))
             total += size
+            slot_totals[self.ctx.stored_data_writers.get(key, None)] += size
             texts.append(f"Key: {key} | Size: {size}B")
         texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
                         f"approximately totaling {Utils.format_SI_prefix(total, power=1024)}B")
+        texts[1:1] = [f"Last written by {self.ctx.slot_info[slot].name if slot in self.ctx.slot_info else slot}: "
+                      f"{Utils.format_SI_prefix(size, power=1024)}B" if slot is not None else
+                      f"Not written since server start: {Utils.format_SI_prefix(size, power=1024)}B"
+                      for slot, size in slot_totals.most_common()]
+        self.output("\n".join(texts))
+
+    def _cmd_traffic(self):
+        """Debug Tool: show how much clients were rate limited and how well broadcasts were shared."""
+        ctx = self.ctx
+        limits = ", ".join(f"{cmd} {rate:g}/s" for cmd, rate in ctx.client_rate_limits.items()) or "none"
+        texts = [f"Throttled {sum(ctx.throttled_commands.values())} commands for {ctx.throttled_time:.1f} seconds "
+                 f"in total. Rate limits: {limits}."]
+        texts += [f"Command: {cmd or 'other'} | Throttled: {count}"
+                  for cmd, count in ctx.throttled_commands.most_common()]
+        texts.append(f"Disconnected {ctx.send_buffer_disconnects} clients for not keeping up with outgoing messages.")
+        texts.append(f"Sent {ctx.broadcast_count} broadcasts, "
+                     f"saving {ctx.broadcast_saved_size} characters of encoding.")
+        for client in ctx.endpoints:
+            transport = client.socket.transport if client.socket else None
+            if transport and transport.get_write_buffer_size():
+                texts.append(f"Client: {client.socket.remote_address} | Waiting to be sent: "
+                             f"{Utils.format_SI_prefix(transport.get_write_buffer_size(), power=1024)}B")
         self.output("\n".join(texts))
 
 
@@ -2736,10 +3339,32 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--metrics_token', default=defaults["metrics_token"],
+                        help="Serve metrics in Prometheus text format at /metrics on the server's port, "
+                             "to requests with this bearer token.")
+    parser.add_argument('--client_rate_limit', nargs=2, action="append", metavar=("CMD", "RATE"),
+                        help="Commands of kind CMD per second a client may send before it is slowed down, "
+                             "with bursts of four times as many. Can be repeated, adds to host.yaml's limits. "
+                             "A rate of 0 disables the limit for CMD.")
+    parser.add_argument('--client_send_buffer_limit', default=defaults["client_send_buffer_limit"], type=int,
+                        help="Bytes of outgoing messages that may wait for a client before it is disconnected. "
+                             "0 to disable.")
     args = parser.parse_args()
+    args.client_rate_limits = get_client_rate_limits(defaults["client_rate_limits"], args.client_rate_limit or ())
     return args
 
 
+def get_client_rate_limits(limits: typing.Mapping[str, float],
+                           overrides: typing.Iterable[typing.Tuple[str, typing.Union[str, float]]] = ()
+                           ) -> typing.Dict[str, float]:
+    """Combine and check client rate limits, dropping disabled ones. Raises ValueError for unknown commands."""
+    combined = {**limits, **{cmd: float(rate) for cmd, rate in overrides}}
+    unknown = set(combined) - client_commands
+    if unknown:
+        raise ValueError(f"Unknown commands in client rate limits: {', '.join(sorted(unknown))}")
+    return {cmd: float(rate) for cmd, rate in combined.items() if rate}
+
+
 async def auto_shutdown(ctx, to_cancel=None):
     with contextlib.suppress(asyncio.TimeoutError):
         await asyncio.wait_for(ctx.exit_event.wait(), ctx.auto_shutdown)
@@ -2783,6 +3408,8 @@ async def main(args: argparse.Namespace):
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
                   args.auto_shutdown, args.compatibility, args.log_network)
+    ctx.client_rate_limits = args.client_rate_limits
+    ctx.client_send_buffer_limit = args.client_send_buffer_limit
     data_filename = args.multidata
 
     if not data_filename:
@@ -2822,12 +3449,16 @@ async def main(args: argparse.Namespace):
         port=ctx.port,
         ssl=ssl_context,
         extensions=[server_per_message_deflate_factory],
+        process_request=metrics_request_handler(ctx, args.metrics_token) if args.metrics_token else None,
     )
     ip = args.host if args.host else Utils.get_public_ipv4()
     logging.info('Hosting game at %s:%d (%s)' % (ip, ctx.port,
                                                  'No password' if not ctx.password else 'Password: %s' % ctx.password))
 
     await ctx.server
+    if args.metrics_token:
+        ctx.metrics_enabled = True
+        async_start(ctx.monitor_loop_lag(), name="monitor loop lag")
     console_task = asyncio.create_task(console(ctx))
     if ctx.auto_shutdown:
         ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
@@ -2860,6 +3491,8 @@ async def main(args: argparse.Namespace):
 client_message_processor = ClientMessageProcessor
 
 if __name__ == '__main__':
+    # only import the worlds of the multiworld being hosted, unless AP_LAZY_WORLDS=0
+    os.environ.setdefault("AP_LAZY_WORLDS", "1")
     try:
         asyncio.run(main(parse_args()))
     except asyncio.exceptions.CancelledError:
@@ -135,7 +135,7 @@ _encode = JSONEncoder(
 ).encode
 
 
-def encode(obj: typing.Any) -> str:
+def _encode_stdlib(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
@@ -200,11 +200,132 @@ except ImportError:
             raise ValueError("JSON document malformed")
 
 
-def decode(s: str) -> typing.Any:
+def _decode_stdlib(s: str) -> typing.Any:
     _check_depth(s)  # raises ValueError
     return _decode(s)
 
 
+class JSONCodec(typing.NamedTuple):
+    """A way to encode and decode network messages, producing and accepting the same documents as any other codec."""
+    name: str
+    encode: typing.Callable[[typing.Any], str]
+    decode: typing.Callable[[str], typing.Any]
+
+
+stdlib_codec = JSONCodec("json", _encode_stdlib, _decode_stdlib)
+codecs: typing.Dict[str, JSONCodec] = {stdlib_codec.name: stdlib_codec}
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    def _make_typed_tuple_encoder(cls: type) -> typing.Callable[[typing.Any], typing.Dict[str, typing.Any]]:
+        """Builds an encoder for a NamedTuple that skips _asdict()'s generic field handling."""
+        namespace: typing.Dict[str, typing.Any] = {}
+        fields = ", ".join(f"{field!r}: obj[{index}]" for index, field in enumerate(cls._fields))
+        exec(f"def encode_{cls.__name__}(obj):\n    return {{{fields}, 'class': {cls.__name__!r}}}", namespace)
+        return namespace[f"encode_{cls.__name__}"]
+
+    # filled in on first use for the other NamedTuples, such as Hint
+    _typed_tuple_encoders = {cls: _make_typed_tuple_encoder(cls)
+                             for cls in (NetworkItem, NetworkPlayer, NetworkSlot)}
+
+    def _orjson_default(obj: typing.Any) -> typing.Any:
+        # orjson calls this for everything it can't serialize natively, which includes any tuple subclass
+        encoder = _typed_tuple_encoders.get(type(obj), None)
+        if encoder:
+            return encoder(obj)
+        if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+            encoder = _typed_tuple_encoders[type(obj)] = _make_typed_tuple_encoder(type(obj))
+            return encoder(obj)
+        if isinstance(obj, (tuple, set, frozenset)):
+            return list(obj)
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+    def _encode_orjson(obj: typing.Any) -> str:
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # integers beyond 64 bit and keys orjson can't stringify; let the stdlib handle or reject them
+            return _encode_stdlib(obj)
+
+    def _make_typed_tuple_decoder(cls: type) -> typing.Callable[[typing.Dict[str, typing.Any]], typing.Any]:
+        """Builds a decoder for an allowlisted NamedTuple that behaves like _object_hook, without its key filtering."""
+        namespace: typing.Dict[str, typing.Any] = {"cls": cls, "defaults": cls._field_defaults,
+                                                   "fallback": _object_hook}
+        required = " and ".join(f"{field!r} in o" for field in cls._fields if field not in cls._field_defaults)
+        args = ", ".join(f"o.get({field!r}, defaults[{field!r}])" if field in cls._field_defaults else f"o[{field!r}]"
+                         for field in cls._fields)
+        exec(f"def decode_{cls.__name__}(o):\n"
+             f"    if {required or 'True'}:\n"
+             f"        return cls({args})\n"
+             f"    return fallback(o)", namespace)
+        return namespace[f"decode_{cls.__name__}"]
+
+    _typed_tuple_decoders = {name: _make_typed_tuple_decoder(cls) for name, cls in allowlist.items()
+                             if name not in custom_hooks}
+
+    class _BigIntegerFound(Exception):
+        pass
+
+    # orjson parses integers that don't fit into 64 bit as float, which end up outside of this range as floats round
+    # to the nearest double; all floats outside of it are whole numbers, so they may have been integers
+    _min_integer = float(-2 ** 63)
+    _max_integer = float(2 ** 64)
+
+    def _apply_object_hook(obj: typing.Any, depth: int) -> typing.Any:
+        """
+        Applies _object_hook bottom-up like JSONDecoder does, while enforcing the same depth limit as _check_depth.
+        """
+        if depth >= 16:
+            raise ValueError("JSON document too complex")
+        if type(obj) is list:
+            for index, value in enumerate(obj):
+                value_type = type(value)
+                if value_type is list or value_type is dict:
+                    obj[index] = _apply_object_hook(value, depth + 1)
+                elif value_type is float and not _min_integer < value < _max_integer:
+                    raise _BigIntegerFound
+            return obj
+        for key, value in obj.items():
+            value_type = type(value)
+            if value_type is list or value_type is dict:
+                obj[key] = _apply_object_hook(value, depth + 1)
+            elif value_type is float and not _min_integer < value < _max_integer:
+                raise _BigIntegerFound
+        class_name = obj.get("class", None)
+        if class_name is None:
+            return obj
+        return _typed_tuple_decoders.get(class_name, _object_hook)(obj)
+
+    def _decode_orjson(s: str) -> typing.Any:
+        try:
+            obj = orjson.loads(s)
+            if type(obj) is list or type(obj) is dict:
+                return _apply_object_hook(obj, 1)
+            if type(obj) is float and not _min_integer < obj < _max_integer:
+                raise _BigIntegerFound
+            return obj
+        except (orjson.JSONDecodeError, _BigIntegerFound):
+            # documents with integers that don't fit into 64 bit are rare enough to leave them to the stdlib; it is
+            # also more lenient, e.g. with NaN and lone surrogates
+            return _decode_stdlib(s)
+
+    codecs["orjson"] = JSONCodec("orjson", _encode_orjson, _decode_orjson)
+
+codec: JSONCodec = codecs.get("orjson", stdlib_codec)
+"""The fastest available codec, used by encode and decode."""
+
+
+def encode(obj: typing.Any) -> str:
+    return codec.encode(obj)
+
+
+def decode(s: str) -> typing.Any:
+    return codec.decode(s)
+
+
 class Endpoint:
     __slots__ = ("socket",)
 
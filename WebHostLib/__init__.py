@@ -43,6 +43,10 @@ app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
 app.config["SELFGEN"] = True  # application process is in charge of scheduling Generations.
 app.config["GAME_PORTS"] = ["49152-65535", 0]
+# serve metrics in Prometheus text format at /metrics on each room's port, to requests with this bearer token
+app.config["ROOM_METRICS_TOKEN"] = None
+# commands per second a client of a room may send by command, e.g. {"Bounce": 100}, unlisted commands are unlimited
+app.config["ROOM_CLIENT_RATE_LIMITS"] = {}
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
 # after what time in seconds should generation be aborted, freeing the queue slot. Can be set to None to disable.
@@ -194,6 +194,8 @@ class MultiworldInstance():
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
         self.game_ports = config["GAME_PORTS"]
+        self.metrics_token = config["ROOM_METRICS_TOKEN"]
+        self.client_rate_limits = config["ROOM_CLIENT_RATE_LIMITS"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
@@ -205,7 +207,8 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host, self.game_ports,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.metrics_token,
+                                                self.client_rate_limits),
                                           name=self.name)
         process.start()
         self.process = process
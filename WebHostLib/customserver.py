@@ -24,7 +24,7 @@ import Utils
 
 from MultiServer import (
     Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
-    server_per_message_deflate_factory,
+    metrics_request_handler, server_per_message_deflate_factory, get_client_rate_limits,
 )
 from Utils import restricted_loads, cache_argsless
 
@@ -165,11 +165,15 @@ class WebHostContext(Context):
             self._start_async_saving(atexit_save=False)
         asyncio.create_task(self.listen_to_db_commands())
 
+    # Rooms keep writing full snapshots instead of journaling, as the trackers and the tracker API read the room's
+    # progress straight from Room.multisave. A journal would leave them behind until the next compaction.
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
+        start = time.perf_counter()
         room = Room.get(id=self.room_id)
         # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
         room.multisave = pickle.dumps(self.get_save())
+        self.record_save(time.perf_counter() - start, len(room.multisave))
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = Utils.utcnow()
@@ -337,7 +341,9 @@ def tear_down_logging(room_id):
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
                        host: str, game_ports: Iterable[str | int],
-                       rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       metrics_token: typing.Optional[str] = None,
+                       client_rate_limits: typing.Optional[typing.Dict[str, float]] = None):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -377,6 +383,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 load_date = today
             return ssl_context
 
+    client_rate_limits = get_client_rate_limits(client_rate_limits or {})
     del ponyconfig
     gc.collect()  # free intermediate objects used during setup
 
@@ -388,6 +395,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
             try:
                 logger = set_up_logging(room_id)
                 ctx = WebHostContext(static_server_data, logger)
+                ctx.client_rate_limits = client_rate_limits
                 ctx.load(room_id)
                 ctx.init_save()
                 assert ctx.server is None
@@ -399,6 +407,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                             ctx.port,
                             ssl=get_ssl_context(),
                             extensions=[server_per_message_deflate_factory],
+                            process_request=metrics_request_handler(ctx, metrics_token) if metrics_token else None,
                         )
                         await ctx.server
                     except OSError:
@@ -409,6 +418,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                         sock=socket_creator.create(ctx.host),
                         ssl=get_ssl_context(),
                         extensions=[server_per_message_deflate_factory],
+                        process_request=metrics_request_handler(ctx, metrics_token) if metrics_token else None,
                     )
                     await ctx.server
                 port = 0
@@ -432,6 +442,9 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx.auto_shutdown = Room.get(id=room_id).timeout
                 if ctx.saving:
                     setattr(asyncio.current_task(), "save", lambda: ctx._save(True))
+                if metrics_token:
+                    ctx.metrics_enabled = True
+                    Utils.async_start(ctx.monitor_loop_lag(), name=f"monitor loop lag {room_id}")
                 assert ctx.shutdown_task is None
                 ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
                 await ctx.shutdown_task
@@ -25,25 +25,28 @@ __all__ = [
 no_gui = False
 skip_autosave = False
 _world_settings_name_cache: dict[str, str] = {}  # TODO: cache on disk and update when worlds change
-_world_settings_name_cache_updated = False
+_world_settings_name_cache_updated = 0  # number of loaded worlds the cache was built from
 _lock = Lock()
 
 
-def _update_cache() -> None:
-    """Load all worlds and update world_settings_name_cache"""
+def _update_cache(load_all: bool = False) -> None:
+    """Update world_settings_name_cache from loaded worlds, loading all worlds first if requested or not lazy"""
     global _world_settings_name_cache_updated
-    if _world_settings_name_cache_updated:
+    import worlds
+    if load_all:
+        worlds.load_worlds()
+    from worlds.AutoWorld import AutoWorldRegister
+    if _world_settings_name_cache_updated == len(AutoWorldRegister.world_types):
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
         for world in AutoWorldRegister.world_types.values():
             annotation = world.__annotations__.get("settings", None)
             if annotation is None or annotation == "ClassVar[Optional['Group']]":
                 continue
             _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
     finally:
-        _world_settings_name_cache_updated = True
+        _world_settings_name_cache_updated = len(AutoWorldRegister.world_types)
 
 
 def fmt_doc(cls: type, level: int) -> str:
@@ -611,6 +614,24 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class MetricsToken(str):
+        """
+        Serve metrics in Prometheus text format at /metrics on the server's port, e.g. for capacity planning.
+        Requests have to send this token as "Authorization: Bearer <token>". If this is null, no metrics are served.
+        """
+
+    class ClientRateLimits(dict):
+        """
+        Commands per second a client may send by command, such as Bounce: 100, before the server slows down
+        reading from it. Bursts of four times as many are allowed. Commands that are not listed are not limited.
+        """
+
+    class ClientSendBufferLimit(int):
+        """
+        Bytes of outgoing messages that may wait for a client before it is disconnected, so it can reconnect and catch
+        up instead of growing the server's memory. 0 to disable.
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -630,6 +651,9 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    metrics_token: MetricsToken | None = None
+    client_rate_limits: ClientRateLimits = ClientRateLimits()
+    client_send_buffer_limit: ClientSendBufferLimit = ClientSendBufferLimit(16 * 1024 * 1024)
 
 
 class GeneratorOptions(Group):
@@ -691,6 +715,43 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class SweepWorkers(int):
+        """
+        Number of threads used to check the reachability of different players' locations concurrently while sweeping.
+        Only speeds up generation on free-threaded Python builds. 1 disables it.
+        """
+
+    class StageWorkers(int):
+        """
+        Number of threads used to run the early generation stages of different players concurrently, for worlds that
+        support it. Only speeds up generation on free-threaded Python builds. 1 disables it.
+        """
+
+    class _CompressLevel(int):
+        def __new__(cls, value: int) -> typing.Self:
+            if not 0 <= value <= 9:
+                raise ValueError(f"{cls.__name__} has to be from 0 to 9, not {value}")
+            return super().__new__(cls, value)
+
+    class ArchiveCompressLevel(_CompressLevel):
+        """
+        Deflate level, from 0 to 9, of output files in the final zip that aren't compressed already.
+        Patch containers and the multidata are compressed already and get stored as they are.
+        """
+
+    class MultidataCompressLevel(_CompressLevel):
+        """
+        zlib level, from 0 to 9, of the multidata.
+        Lower levels save time on large multiworlds, for a slightly bigger file.
+        """
+
+    class PlayerFileWorkers(int):
+        """
+        Number of processes used to read player files and roll their options concurrently.
+        Rolls on processes are seeded individually, so the result is the same for any number above 1,
+        but differs from rolling in order. 1 disables it.
+        """
+
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
     allow_quantity: AllowQuantity | bool = False
@@ -700,6 +761,11 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    sweep_workers: SweepWorkers = SweepWorkers(1)
+    stage_workers: StageWorkers = StageWorkers(1)
+    player_file_workers: PlayerFileWorkers = PlayerFileWorkers(1)
+    archive_compress_level: ArchiveCompressLevel = ArchiveCompressLevel(9)
+    multidata_compress_level: MultidataCompressLevel = MultidataCompressLevel(9)
     loglevel: str = "info"
     logtime: bool = False
 
@@ -759,8 +825,10 @@ class Settings(Group):
         elif key not in dir(self) or isinstance(super().__getattribute__(key), dict):
             # settings class not loaded yet
             if key not in _world_settings_name_cache:
-                # find world that provides the settings class
+                # find world that provides the settings class, importing unloaded worlds if needed
                 _update_cache()
+                if key not in _world_settings_name_cache:
+                    _update_cache(load_all=True)
                 # check for missing keys to update _changed
                 for world_settings_name in _world_settings_name_cache:
                     if world_settings_name not in dir(self):
@@ -870,7 +938,7 @@ class Settings(Group):
 
     def dump(self, f: TextIO, level: int = 0) -> None:
         # load all world setting classes
-        _update_cache()
+        _update_cache(load_all=True)
         for key in _world_settings_name_cache:
             self.__getattribute__(key)  # load all worlds
         super().dump(f, level)
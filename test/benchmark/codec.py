@@ -0,0 +1,69 @@
+"""Micro benchmark comparing the network JSON codecs available in NetUtils on typical server traffic"""
+
+from timeit import timeit
+from typing import Any
+
+
+def make_payloads() -> dict[str, Any]:
+    from random import Random
+    from NetUtils import (Hint, HintStatus, JSONTypes, NetworkItem, add_json_item, add_json_location,
+                          add_json_text)
+
+    r = Random()
+    r.seed(0)
+    items = [NetworkItem(r.randint(1000, 1999), r.randint(1000, 1999), r.randint(1, 10),
+                         r.choice((0, 0, 0, 0, 0, 0, 0, 1, 2, 3))) for _ in range(200)]
+
+    item_sends = []
+    for item in items[:50]:
+        parts: list[dict[str, Any]] = []
+        add_json_text(parts, item.player, type=JSONTypes.player_id)
+        add_json_text(parts, " sent ")
+        add_json_item(parts, item.item, 1, item.flags)
+        add_json_text(parts, " to ")
+        add_json_text(parts, 1, type=JSONTypes.player_id)
+        add_json_text(parts, " (")
+        add_json_location(parts, item.location, item.player)
+        add_json_text(parts, ")")
+        item_sends.append({"cmd": "PrintJSON", "data": parts, "type": "ItemSend", "receiving": 1, "item": item})
+
+    hints = {Hint(1, item.player, item.location, item.item, False, "", item.flags, HintStatus.HINT_PRIORITY)
+             for item in items[:50]}
+
+    return {
+        "ReceivedItems": [{"cmd": "ReceivedItems", "index": 0, "items": items}],
+        "PrintJSON": item_sends,
+        "SetReply hints": [{"cmd": "SetReply", "key": "_read_hints_0_1", "value": hints}],
+        "LocationChecks": [{"cmd": "LocationChecks", "locations": [item.location for item in items]}],
+        "Set": [{"cmd": "Set", "key": "tracker", "default": {}, "want_reply": True,
+                 "operations": [{"operation": "update", "value": {str(n): n for n in range(20)}}]}],
+    }
+
+
+def timeit_best_of_5(stmt: str, scope: dict[str, Any]) -> float:
+    """
+    Benchmark some code, returning the best of 5 runs.
+    :param stmt: Code to benchmark
+    :param scope: Globals the code runs in
+    :return: Time taken in microseconds
+    """
+    return min(timeit(stmt, number=1000, globals=scope) for _ in range(5)) * 1000
+
+
+def main() -> None:
+    from NetUtils import codecs
+
+    for name, payload in make_payloads().items():
+        for codec in codecs.values():
+            message = codec.encode(payload)
+            assert codec.decode(message) is not None
+            encode_time = timeit_best_of_5("encode(payload)", {"encode": codec.encode, "payload": payload})
+            decode_time = timeit_best_of_5("decode(message)", {"decode": codec.decode, "message": message})
+            print(f"{name:<16} {codec.name:<7} encode: {encode_time:8.2f} us, decode: {decode_time:8.2f} us, "
+                  f"{len(message)} characters")
+
+
+if __name__ == "__main__":
+    import path_change
+    path_change.change_home()
+    main()
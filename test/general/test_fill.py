@@ -463,6 +463,26 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_unreachable_location_checked_once_per_state(self):
+        """Test that a location's access rule is not re-evaluated for each item tested against it"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 2, 1)
+        player2 = generate_player_data(multiworld, 2, 0, 1)
+        evaluations = 0
+
+        def never_reachable(state) -> bool:
+            nonlocal evaluations
+            evaluations += 1
+            return False
+
+        set_rule(player1.locations[0], never_reachable)
+        fill_restrictive(multiworld, multiworld.state, player1.locations.copy(),
+                         player1.prog_items + player2.prog_items, allow_partial=True, swap=False)
+
+        self.assertIsNotNone(player1.locations[1].item)
+        self.assertIsNone(player1.locations[0].item)
+        self.assertEqual(evaluations, 1)
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
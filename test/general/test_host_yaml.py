@@ -6,7 +6,7 @@ from tempfile import TemporaryDirectory, TemporaryFile
 from typing import Any, Dict, List, cast
 
 import Utils
-from settings import Group, Settings, ServerOptions
+from settings import GeneratorOptions, Group, Settings, ServerOptions
 
 
 class TestIDs(unittest.TestCase):
@@ -105,3 +105,15 @@ class TestSettingsSave(unittest.TestCase):
             settings = Settings(filename)
             self.assertEqual(settings.server_options.release_mode, new_release_mode,
                              "Settings were not overwritten")
+
+
+class TestSettingsValidation(unittest.TestCase):
+    def test_compress_level(self) -> None:
+        """Test that compress levels outside of zlib's range are rejected when loading"""
+        options = GeneratorOptions()
+        options.update({"archive_compress_level": 0, "multidata_compress_level": 9})
+        self.assertEqual(options.archive_compress_level, 0)
+        self.assertEqual(options.multidata_compress_level, 9)
+        for key, value in (("archive_compress_level", 10), ("multidata_compress_level", -1)):
+            with self.subTest(key), self.assertRaises(ValueError):
+                GeneratorOptions().update({key: value})
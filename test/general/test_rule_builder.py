@@ -640,6 +640,127 @@ class TestCacheDisabled(RuleBuilderTestCase):
         self.assertTrue(location.can_reach(self.state))
 
 
+class TestIncrementalReachability(RuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    state: CollectionState  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.world_cls.incremental_reachability = True
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+        self.state = self.multiworld.state
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        region3 = Region("Region 3", self.player, self.multiworld)
+        region4 = Region("Region 4", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2, region3, region4])
+
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, lambda state: state.has("Item 2", self.player))
+        world.create_entrance(region1, region4, CanReachRegion("Region 2"))
+
+    def test_entrance_item_dependencies(self) -> None:
+        self.assertEqual(self.world.get_entrance("Region 1 -> Region 2").get_item_dependencies(), {"Item 1"})
+        self.assertIsNone(self.world.get_entrance("Region 1 -> Region 3").get_item_dependencies())
+        self.assertIsNone(self.world.get_entrance("Region 1 -> Region 4").get_item_dependencies())
+
+        entrance = self.world.get_entrance("Region 1 -> Region 2")
+        self.world.set_rule(entrance, Has("Item 3"))
+        self.assertEqual(entrance.get_item_dependencies(), {"Item 3"})
+
+    def test_only_dependent_connections_rechecked(self) -> None:
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+        blocked = {entrance.name for entrance in self.state.blocked_connections[self.player]}
+        self.assertEqual(blocked, {"Region 1 -> Region 2", "Region 1 -> Region 3", "Region 1 -> Region 4"})
+
+        recheck = {entrance.name for entrance in self.state._get_connections_to_recheck(self.player, {"Item 5"})}
+        self.assertEqual(recheck, {"Region 1 -> Region 3", "Region 1 -> Region 4"})
+        recheck = {entrance.name for entrance in self.state._get_connections_to_recheck(self.player, {"Item 1"})}
+        self.assertEqual(recheck, {"Region 1 -> Region 2", "Region 1 -> Region 3", "Region 1 -> Region 4"})
+
+    def test_reachability(self) -> None:
+        self.state.collect(self.world.create_item("Item 5"))
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+        self.assertFalse(self.state.stale_items[self.player])
+
+        self.state.collect(self.world.create_item("Item 2"))
+        self.assertTrue(self.state.can_reach_region("Region 3", self.player))
+        self.assertFalse(self.state.can_reach_region("Region 4", self.player))
+
+        state = self.state.copy()
+        state.collect(self.world.create_item("Item 1"))
+        self.assertTrue(state.can_reach_region("Region 2", self.player))
+        self.assertTrue(state.can_reach_region("Region 4", self.player))
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+
+
+class TestSpheres(RuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2])
+        region1.add_locations({"Location 1": 1, "Location 2": 2, "Location 3": 3}, RuleBuilderLocation)
+        region2.add_locations({"Location 4": 4}, RuleBuilderLocation)
+        world.create_entrance(region1, region2, Has("Item 2"))
+        world.set_rule(world.get_location("Location 2"), Has("Item 1"))
+        world.set_rule(world.get_location("Location 3"), lambda state: state.has("Item 3", self.player))
+
+        for location, item in (("Location 1", "Item 1"), ("Location 2", "Item 2"), ("Location 3", "Item 4"),
+                               ("Location 4", "Item 3")):
+            world.get_location(location).place_locked_item(world.create_item(item))
+
+    def test_location_item_dependencies(self) -> None:
+        self.assertEqual(self.world.get_location("Location 1").get_item_dependencies(), set())
+        self.assertEqual(self.world.get_location("Location 2").get_item_dependencies(), {"Item 1"})
+        self.assertIsNone(self.world.get_location("Location 3").get_item_dependencies())
+
+    def test_spheres(self) -> None:
+        spheres = [{location.name for location in sphere} for sphere in self.multiworld.get_spheres()]
+        self.assertEqual(spheres, [{"Location 1"}, {"Location 2"}, {"Location 4"}, {"Location 3"}])
+
+        results = self.multiworld.get_sphere_results()
+        self.assertEqual(results.states, [])
+        self.assertFalse(results.unreachable)
+        self.assertTrue(results.state.has_all(("Item 1", "Item 2", "Item 3", "Item 4"), self.player))
+
+    def test_unreachable(self) -> None:
+        self.world.set_rule(self.world.get_location("Location 2"), Has("Item 5"))
+        spheres = [{location.name for location in sphere} for sphere in self.multiworld.get_spheres()]
+        self.assertEqual(spheres, [{"Location 1"}, set(), {"Location 2", "Location 3", "Location 4"}])
+
+    def test_results_shared_once_final(self) -> None:
+        self.assertIsNot(self.multiworld.get_sphere_results(), self.multiworld.get_sphere_results())
+        self.multiworld.spheres_final = True
+        self.assertIs(self.multiworld.get_sphere_results(), self.multiworld.get_sphere_results())
+        self.assertIsNot(self.multiworld.get_sphere_results(), self.multiworld.get_sphere_results(sendable=True))
+
+        results = self.multiworld.get_sphere_results()
+        with_states = self.multiworld.get_sphere_results(keep_states=True)
+        self.assertIsNot(with_states, results)
+        self.assertEqual(len(with_states.states), len(with_states.spheres))
+        self.assertIs(self.multiworld.get_sphere_results(), with_states)
+        self.multiworld.clear_sphere_results()
+        self.assertIsNot(self.multiworld.get_sphere_results(), with_states)
+
+
 class TestRules(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
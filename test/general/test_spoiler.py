@@ -0,0 +1,25 @@
+import unittest
+
+from BaseClasses import Item, ItemClassification
+from test.general import generate_locations, generate_test_multiworld
+
+
+class TestPlaythrough(unittest.TestCase):
+    def test_only_required_items_in_playthrough(self) -> None:
+        """Ensure the playthrough keeps exactly the items needed to beat the game, even when tested in groups."""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locations = generate_locations(7, 1, menu)
+        locations[6].access_rule = lambda state: state.has("Key", 1, 2)
+        for location in locations[:4]:
+            location.place_locked_item(Item("Key", ItemClassification.progression, None, 1))
+        for location in locations[4:6]:
+            location.place_locked_item(Item("Junk", ItemClassification.progression, None, 1))
+        locations[6].place_locked_item(Item("Victory", ItemClassification.progression, None, 1))
+        multiworld.completion_condition[1] = lambda state: state.has("Victory", 1)
+
+        multiworld.spoiler.create_playthrough(create_paths=False)
+
+        self.assertEqual(len(multiworld.spoiler.playthrough), 3)
+        self.assertEqual(list(multiworld.spoiler.playthrough["1"].values()), ["Key", "Key"])
+        self.assertEqual(list(multiworld.spoiler.playthrough["2"].values()), ["Victory"])
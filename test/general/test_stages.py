@@ -0,0 +1,30 @@
+import unittest
+
+from BaseClasses import MultiWorld
+from worlds.AutoWorld import AutoWorldRegister, call_all, concurrent_stage_methods
+from . import setup_multiworld
+
+
+class TestConcurrentStages(unittest.TestCase):
+    @staticmethod
+    def generate(stage_workers: int) -> MultiWorld:
+        multiworld = setup_multiworld([AutoWorldRegister.world_types["APQuest"]] * 4, (), seed=1)
+        multiworld.stage_workers = stage_workers
+        for step in ("generate_early", "create_regions", "create_items", "set_rules"):
+            call_all(multiworld, step)
+        return multiworld
+
+    def test_concurrent_stages_match_sequential(self) -> None:
+        """Ensure running stages of concurrent worlds on several threads builds the same multiworld as sequentially."""
+        self.assertTrue(AutoWorldRegister.world_types["APQuest"].concurrent_stages)
+        self.assertEqual({"generate_early", "create_regions", "create_items", "set_rules"}, concurrent_stage_methods)
+        sequential = self.generate(1)
+        concurrent = self.generate(4)
+
+        self.assertEqual([(item.name, item.player) for item in sequential.itempool],
+                         [(item.name, item.player) for item in concurrent.itempool])
+        self.assertEqual([(location.name, location.player) for location in sequential.get_locations()],
+                         [(location.name, location.player) for location in concurrent.get_locations()])
+        for player in sequential.player_ids:
+            self.assertEqual(sequential.worlds[player].random.random(), concurrent.worlds[player].random.random())
+        self.assertTrue(concurrent.random.passthrough)
@@ -1,7 +1,9 @@
 import unittest
 
+from BaseClasses import CollectionState, Item, ItemClassification, ItemCounts, ItemNameIndex, PlayerStateDict
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import TestWorld, generate_items, generate_locations, generate_test_multiworld, setup_multiworld, \
+    setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -28,3 +30,145 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(allow_partial_entrances=True))
+
+
+class TestStateCopy(unittest.TestCase):
+    def test_copy_shares_player_data(self) -> None:
+        """Ensure copies share per-player data until it's accessed, and neither side sees the other's changes."""
+        multiworld = setup_multiworld([TestWorld, TestWorld, TestWorld])
+        state = multiworld.state
+        state.prog_items[1]["Item"] = 1
+
+        copied = state.copy()
+        self.assertEqual(dict.__len__(copied.prog_items), 0)
+        self.assertEqual(len(copied.prog_items), 3)
+
+        copied.prog_items[1]["Item"] += 1
+        state.prog_items[2]["Other Item"] = 1
+        self.assertEqual(dict.__len__(copied.prog_items), 1)
+        self.assertEqual(state.count("Item", 1), 1)
+        self.assertEqual(copied.count("Item", 1), 2)
+        self.assertEqual(copied.count("Other Item", 2), 0)
+
+        second_copy = copied.copy()
+        second_copy.prog_items[1]["Item"] += 1
+        self.assertEqual(copied.count("Item", 1), 2)
+        self.assertEqual(second_copy.count("Item", 1), 3)
+        self.assertEqual(list(second_copy.prog_items), [1, 2, 3])
+        self.assertEqual(second_copy.prog_items, {1: {"Item": 3}, 2: {}, 3: {}})
+
+    def test_remove_returns_changed(self) -> None:
+        """Ensure removing an item reports whether it changed the state, mirroring collect."""
+        multiworld = setup_multiworld([TestWorld])
+        state = multiworld.state
+        progression = Item("Progression", ItemClassification.progression, None, 1)
+        filler = Item("Filler", ItemClassification.filler, None, 1)
+
+        self.assertTrue(state.collect(progression, True))
+        self.assertFalse(state.collect(filler, True))
+        self.assertTrue(state.remove(progression))
+        self.assertFalse(state.remove(filler))
+        self.assertEqual(state.count("Progression", 1), 0)
+
+
+class TestItemCounts(unittest.TestCase):
+    def test_counter_behavior(self) -> None:
+        """Ensure ItemCounts behaves like the Counter it replaces, including for names not interned up front."""
+        counts = ItemCounts(ItemNameIndex(["Sword", "Shield"], {}))
+        counts["Sword"] += 2
+        counts["Event"] += 1
+        self.assertEqual(counts["Sword"], 2)
+        self.assertEqual(counts["Shield"], 0)
+        self.assertEqual(counts["Unknown"], 0)
+        self.assertNotIn("Shield", counts)
+        self.assertEqual(counts, {"Sword": 2, "Event": 1})
+
+        copied = counts.copy()
+        copied["Sword"] -= 1
+        del copied["Event"]
+        del copied["Unknown"]
+        self.assertEqual(counts, {"Sword": 2, "Event": 1})
+        self.assertEqual(copied, {"Sword": 1})
+        self.assertEqual(copied.total(), 1)
+
+    def test_state_group_checks(self) -> None:
+        """Ensure the item group checks of CollectionState give the same results for ItemCounts."""
+        multiworld = setup_multiworld([TestWorld])
+        index = ItemNameIndex(["A", "B", "C"], {"Group": {"A", "B", "Other"}})
+        state = multiworld.state
+        state.prog_items[1] = ItemCounts(index)
+        state.add_item("A", 1, 3)
+        state.add_item("C", 1)
+        state.add_item("Other", 1)
+        multiworld.worlds[1].item_name_groups = {"Group": {"A", "B", "Other"}}
+
+        self.assertEqual(state.count_group("Group", 1), 4)
+        self.assertEqual(state.count_group_unique("Group", 1), 2)
+        self.assertTrue(state.has_group("Group", 1, 4))
+        self.assertFalse(state.has_group("Group", 1, 5))
+        self.assertTrue(state.has_group_unique("Group", 1, 2))
+        self.assertFalse(state.has_group_unique("Group", 1, 3))
+        state.remove_item("A", 1, 3)
+        self.assertEqual(state.count_group("Group", 1), 1)
+
+
+class TestParallelSweep(unittest.TestCase):
+    def test_parallel_sweep_matches_sequential(self) -> None:
+        """Ensure sweeping with multiple workers collects the same items as a sequential sweep."""
+        players = 3
+        multiworld = generate_test_multiworld(players)
+        locations = [generate_locations(4, player, multiworld.get_region("Menu", player))
+                     for player in range(1, players + 1)]
+        items = [generate_items(4, player, True) for player in range(1, players + 1)]
+        # chain the locations across players, so each one is unlocked by the item found at the previous one
+        chain = [(player, index) for index in range(4) for player in range(players)]
+        for (player, index), (next_player, next_index) in zip(chain, chain[1:]):
+            location = locations[next_player][next_index]
+            location.access_rule = lambda state, item=items[next_player][next_index]: state.has(item.name, item.player)
+            locations[player][index].place_locked_item(items[next_player][next_index])
+        locations[-1][-1].place_locked_item(items[0][0])
+
+        sequential = CollectionState(multiworld)
+        sequential.sweep_for_advancements()
+        multiworld.sweep_workers = 4
+        parallel = CollectionState(multiworld)
+        parallel.sweep_for_advancements()
+
+        self.assertEqual(len(sequential.advancements), players * 4)
+        self.assertEqual(parallel.advancements, sequential.advancements)
+        self.assertEqual(parallel.prog_items, sequential.prog_items)
+
+    def test_parallel_sweep_materializes_shared_state(self) -> None:
+        """Ensure the concurrent checks of a copied state never have to copy shared per-player values themselves."""
+        players = 3
+        multiworld = generate_test_multiworld(players)
+        for player in range(1, players + 1):
+            locations = generate_locations(2, player, multiworld.get_region("Menu", player))
+            items = generate_items(2, player, True)
+            locations[1].access_rule = lambda state, item=items[0]: state.has(item.name, item.player)
+            for location, item in zip(locations, items):
+                location.place_locked_item(item)
+
+        multiworld.sweep_workers = 4
+        state = CollectionState(multiworld)
+        for player in multiworld.player_ids:
+            state.update_reachable_regions(player)
+        # nothing is stale, so only the concurrent checks would access the values shared with the original state
+        state = state.copy()
+        # like the per-player caches that worlds add through additional_init_functions
+        state.world_cache = PlayerStateDict(pending={player: set() for player in multiworld.player_ids})
+        partition_reachable = state._partition_reachable
+        pending = []
+
+        def check_pending(locations):
+            pending.extend(bool(player_dict.pending) for player_dict in
+                           (state.prog_items, state.reachable_regions, state.blocked_connections,
+                            state.stale_items, state.world_cache))
+            return partition_reachable(locations)
+
+        state._partition_reachable = check_pending
+        state.sweep_for_advancements()
+
+        self.assertEqual(len(state.advancements), players * 2)
+        self.assertTrue(pending)
+        self.assertFalse(any(pending))
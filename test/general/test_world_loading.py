@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+from Utils import store_data_package_for_checksum
+from worlds import (_read_cached_data_package, failed_world_loads, hint_blacklists, load_data_packages, load_worlds,
+                    network_data_package, world_sources)
+from worlds.AutoWorld import AutoWorldRegister
+
+
+class TestWorldLoading(unittest.TestCase):
+    def test_loaded_sources_know_their_game(self) -> None:
+        """Tests that every loaded world source recorded its game, so later lazy loads can skip importing it"""
+        games = set(AutoWorldRegister.world_types)
+        for source in world_sources:
+            if source.loaded and source.game is not None and source.name not in failed_world_loads:
+                with self.subTest(source=source.name):
+                    self.assertIn(source.game, games)
+
+    def test_load_loaded_worlds(self) -> None:
+        """Tests that requesting already loaded or unknown games doesn't import anything"""
+        self.assertEqual({}, load_worlds(AutoWorldRegister.world_types))
+        self.assertEqual({}, load_worlds(()))
+
+    def test_load_data_packages(self) -> None:
+        """Tests that data packages of loaded worlds come from network_data_package, along with their hint blacklist"""
+        packages = load_data_packages(["Archipelago", "Not A Game"])
+        self.assertEqual(["Archipelago"], list(packages))
+        self.assertIs(network_data_package["games"]["Archipelago"], packages["Archipelago"])
+        self.assertEqual(AutoWorldRegister.world_types["Archipelago"].hint_blacklist, hint_blacklists["Archipelago"])
+
+    def test_cached_data_package(self) -> None:
+        """Tests that a world's cached data package is read back whole, even after a client cached it without groups"""
+        source = next(source for source in world_sources if source.game == "APQuest")
+        if not source.loaded:
+            self.skipTest("APQuest is not loaded")
+        # MultiServer.Context removes the groups from network_data_package, so don't rely on them being there
+        package = network_data_package["games"]["APQuest"]
+        client_package = {key: value for key, value in package.items() if not key.endswith("_groups")}
+        store_data_package_for_checksum("APQuest", client_package)
+        with mock.patch.object(source, "loaded", False):
+            cached = _read_cached_data_package(source)
+        self.assertIsNotNone(cached)
+        self.assertIn("item_name_groups", cached)
+        self.assertIn("location_name_groups", cached)
+        self.assertEqual(client_package, {key: value for key, value in cached.items() if not key.endswith("_groups")})
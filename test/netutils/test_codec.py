@@ -0,0 +1,68 @@
+import unittest
+from typing import Any
+from unittest import mock
+
+from NetUtils import (Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, Version, codecs,
+                      stdlib_codec)
+
+
+class CodecTest(unittest.TestCase):
+    data: list[dict[str, Any]] = [
+        {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3), NetworkItem(4, 5, 6, 1)]},
+        {"cmd": "Connected", "players": [NetworkPlayer(0, 1, "Alias", "Name")],
+         "slot_info": {1: NetworkSlot("Name", "Game", SlotType.player), 2: NetworkSlot("Group", "Game",
+                                                                                       SlotType.group, (1,))},
+         "checked_locations": {1, 2, 3}, "missing_locations": (4, 5)},
+        {"cmd": "SetReply", "key": "_read_hints_0_1",
+         "value": [Hint(1, 2, 3, 4, False, "Entrance", 1, HintStatus.HINT_PRIORITY)]},
+        {"cmd": "Set", "key": "big", "value": 2 ** 70, "negative": -2 ** 64, "float": 1.5, "text": "ä☃"},
+        {"cmd": "Connect", "version": {"major": 0, "minor": 6, "build": 2, "class": "Version"}},
+    ]
+
+    def test_encode(self) -> None:
+        """Tests that every codec produces the same documents as the stdlib codec"""
+        for codec in codecs.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(stdlib_codec.encode(self.data), codec.encode(self.data))
+
+    def test_decode(self) -> None:
+        """Tests that every codec decodes documents to the same objects as the stdlib codec"""
+        message = stdlib_codec.encode(self.data)
+        expected = stdlib_codec.decode(message)
+        self.assertEqual(NetworkItem(4, 5, 6, 1), expected[0]["items"][1])
+        self.assertEqual(2 ** 70, expected[3]["value"])
+        self.assertEqual(Version(0, 6, 2), expected[4]["version"])
+        for codec in codecs.values():
+            with self.subTest(codec=codec.name):
+                decoded = codec.decode(message)
+                self.assertEqual(expected, decoded)
+                self.assertIs(type(expected[0]["items"][0]), type(decoded[0]["items"][0]))
+
+    def test_typed_tuple_fields(self) -> None:
+        """Tests that unknown fields are dropped and missing optional fields use their default"""
+        message = '[{"class": "NetworkItem", "item": 1, "location": 2, "player": 3, "extra": 4}]'
+        for codec in codecs.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual([NetworkItem(1, 2, 3, 0)], codec.decode(message))
+                with self.assertRaises(TypeError):
+                    codec.decode('[{"class": "NetworkItem", "item": 1}]')
+
+    def test_integer_range(self) -> None:
+        """Tests that integers at and beyond the 64 bit limits decode exactly and floats stay floats"""
+        numbers = [2 ** 64 - 1, 2 ** 64, -2 ** 63, -2 ** 63 - 1, 10 ** 30, 1.5, 1e19, -0.0]
+        message = stdlib_codec.encode(numbers)
+        for codec in codecs.values():
+            with self.subTest(codec=codec.name):
+                decoded = codec.decode(message)
+                self.assertEqual(numbers, decoded)
+                self.assertEqual([type(number) for number in numbers], [type(number) for number in decoded])
+
+    @unittest.skipUnless("orjson" in codecs, "orjson is not installed")
+    def test_orjson_floats(self) -> None:
+        """Tests that orjson only leaves documents to the stdlib for integers it can't parse as such"""
+        with mock.patch("NetUtils._decode_stdlib") as decode_stdlib:
+            self.assertEqual(codecs["orjson"].decode('{"x": [1.5, -2e18]}'), {"x": [1.5, -2e18]})
+            self.assertEqual(codecs["orjson"].decode("0.25"), 0.25)
+            decode_stdlib.assert_not_called()
+            codecs["orjson"].decode('{"x": [18446744073709551616]}')
+            decode_stdlib.assert_called_once()
@@ -1,9 +1,13 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import argparse
+import json
 import unittest
 import os
 import os.path
+import random
 import sys
+import zipfile
 
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -62,6 +66,11 @@ class TestGenerateMain(unittest.TestCase):
         Main.main(*Generate.main())
 
         self.assertOutput(self.output_tempdir.name)
+        with zipfile.ZipFile(next(Path(self.output_tempdir.name).glob('*.zip'))) as zf:
+            compress_types = {Path(info.filename).suffix: info.compress_type for info in zf.infolist()}
+        # multidata is compressed already, the spoiler isn't
+        self.assertEqual(compress_types[".archipelago"], zipfile.ZIP_STORED)
+        self.assertEqual(compress_types[".txt"], zipfile.ZIP_DEFLATED)
 
     def test_generate_relative(self):
         sys.argv = [sys.argv[0], '--seed', '0',
@@ -72,6 +81,27 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile(self):
+        sys.argv = [sys.argv[0], '--seed', '0', '--profile',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        profile_files = list(Path(self.output_tempdir.name).glob('*_Profile.json'))
+        self.assertEqual(len(profile_files), 1)
+        with open(profile_files[0], encoding="utf-8") as f:
+            profile = json.load(f)
+        for stage in ("generate_early", "create_regions", "set_rules", "fill", "generate_output", "spoiler"):
+            self.assertIn(stage, profile["stages"])
+            self.assertEqual(profile["stages"][stage]["calls"], 1)
+        self.assertIn("generate_early", profile["players"]["1"]["calls"])
+        if profile["peak_rss"] is not None:
+            self.assertGreater(profile["peak_rss"], 0)
+            growth = sum(stage["peak_rss_growth"] for stage in profile["stages"].values())
+            self.assertLessEqual(growth, profile["peak_rss"])
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -94,6 +124,21 @@ class TestGenerateMain(unittest.TestCase):
         self.assertOutput(self.output_tempdir.name)
 
 
+class TestArchiveOutputFiles(unittest.TestCase):
+    def test_duplicate_names(self):
+        """Files of the same name in different output folders must not end up in the archive twice"""
+        with TemporaryDirectory() as temp_dir:
+            for folder in ("1", "2"):
+                os.mkdir(os.path.join(temp_dir, folder))
+                with open(os.path.join(temp_dir, folder, "output.txt"), "w") as f:
+                    f.write(folder)
+            with zipfile.ZipFile(os.path.join(temp_dir, "archive.zip"), "w", zipfile.ZIP_DEFLATED) as zf:
+                Main.archive_output_files(zf, os.path.join(temp_dir, "1"), 9)
+                with self.assertRaises(FileExistsError):
+                    Main.archive_output_files(zf, os.path.join(temp_dir, "2"), 9)
+                self.assertEqual(zf.namelist(), ["output.txt"])
+
+
 class TestGenerateWeights(TestGenerateMain):
     """Tests Generate.py using a weighted file to generate for multiple players."""
 
@@ -108,8 +153,9 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile = None
 
-    def test_generate_yaml(self):
+    def generate_weights(self, *extra_args: str) -> argparse.Namespace:
         from settings import get_settings
         from Utils import user_path, local_path
         settings = get_settings()
@@ -120,21 +166,40 @@ class TestGenerateWeights(TestGenerateMain):
         user_path_backup = user_path.cached_path
         user_path.cached_path = local_path()
         try:
-            sys.argv = [sys.argv[0], "--seed", "1"]
+            sys.argv = [sys.argv[0], "--seed", "1", *extra_args]
             namespace, seed = Generate.main()
         finally:
             user_path.cached_path = user_path_backup
 
+        self.assertEqual(seed, 1)
+        return namespace
+
+    def test_generate_yaml(self):
+        namespace = self.generate_weights()
+
         # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
         expected_results = {
             "accessibility": [0, 2, 0, 2, 2],
             "progression_balancing": [0, 50, 99, 0, 50],
         }
 
-        self.assertEqual(seed, 1)
         for option_name, results in expected_results.items():
             for player, result in enumerate(results, 1):
                 self.assertEqual(
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+    def test_generate_yaml_workers(self):
+        """Tests that rolling on worker processes gives the same results for any number of them"""
+        two_workers = self.generate_weights("--player_file_workers", "2")
+        three_workers = self.generate_weights("--player_file_workers", "3")
+        for option_name in ("accessibility", "progression_balancing"):
+            self.assertEqual(getattr(two_workers, option_name), getattr(three_workers, option_name))
+
+    def test_roll_settings_seeded(self):
+        """Tests that a seeded roll leaves the random module as it found it"""
+        yaml = Generate.read_weights_yamls(str(self.abs_input_dir / "weights.yaml"))[0]
+        state = random.getstate()
+        Generate.roll_settings_seeded(yaml, Generate.PlandoOptions.bosses, 1)
+        self.assertEqual(state, random.getstate())
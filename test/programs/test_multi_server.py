@@ -1,5 +1,18 @@
+import asyncio
+import functools
+import gc
+import os
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import websockets
+
+import MultiServer
+from MultiServer import (Client, Context, ServerCommandProcessor, TokenBucket, get_client_rate_limits,
+                         metrics_request_handler, process_client_cmd, send_items_to, send_new_items,
+                         set_connection_timer)
+from NetUtils import ClientStatus, Hint, HintStatus, NetworkItem
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +51,434 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestHintIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.hint = Hint(2, 1, 10, 5, False)
+        self.ctx.set_hints(0, 1, {self.hint})
+        self.ctx.set_hints(0, 2, {self.hint})
+
+    def test_get_hint(self) -> None:
+        self.assertIs(self.ctx.get_hint(0, 1, 10), self.hint)
+        self.assertIsNone(self.ctx.get_hint(0, 2, 10), "hints are only found by their finding player")
+        self.assertIsNone(self.ctx.get_hint(0, 1, 11))
+
+        new_hint = self.hint.re_prioritize(self.ctx, HintStatus.HINT_PRIORITY)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, self.hint, new_hint)
+        self.assertIs(self.ctx.get_hint(0, 1, 10), new_hint)
+        self.ctx.set_hints(0, 1, set())
+        self.assertIsNone(self.ctx.get_hint(0, 1, 10))
+
+    def test_recheck_location_hints(self) -> None:
+        self.ctx.location_checks[0, 1] |= {10, 11}
+        changed: set[tuple[int, int]] = set()
+        self.ctx.recheck_location_hints(0, 1, [11], changed)
+        self.assertFalse(changed)
+        self.assertIn(self.hint, self.ctx.hints[0, 2])
+
+        self.ctx.recheck_location_hints(0, 1, [10], changed)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        found_hint = self.ctx.get_hint(0, 1, 10)
+        self.assertTrue(found_hint.found)
+        self.assertEqual(self.ctx.hints[0, 1], {found_hint})
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint})
+
+
+class TestSpheres(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+
+    def test_no_spheres(self) -> None:
+        self.assertEqual(self.ctx.get_sphere(1, 10), -1)
+        self.assertEqual(self.ctx.get_remaining_up_to_sphere(0, 1, 5), [])
+
+    def test_sphere_lookup(self) -> None:
+        self.ctx._load_spheres([{1: {10, 11}}, {1: {12}, 2: {20}}, {1: {13}}])
+        self.assertEqual(self.ctx.get_sphere(1, 11), 0)
+        self.assertEqual(self.ctx.get_sphere(1, 13), 2)
+        self.assertEqual(self.ctx.get_sphere(2, 20), 1)
+        with self.assertRaises(KeyError):
+            self.ctx.get_sphere(2, 10)
+
+        self.ctx.location_checks[0, 1] |= {10}
+        self.assertEqual(self.ctx.get_remaining_up_to_sphere(0, 1, 1), [11, 12])
+        self.assertEqual(self.ctx.get_remaining_up_to_sphere(1, 1, 0), [10, 11])
+
+    def test_missing_up_to_sphere_command(self) -> None:
+        processor = ServerCommandProcessor(self.ctx)
+        processor.output = mock.MagicMock()
+        self.assertFalse(processor._cmd_missing_up_to_sphere("Player1", "1"))
+
+        self.ctx._load_spheres([{1: {10, 11}}, {1: {12}}])
+        self.ctx.player_names = {(0, 1): "Player1"}
+        self.ctx.games = {1: "Game"}
+        self.ctx.location_names = {"Game": {10: "Ten", 11: "Eleven", 12: "Twelve"}}
+        self.ctx.location_checks[0, 1] |= {10}
+        self.assertFalse(processor._cmd_missing_up_to_sphere("Player1", "first"))
+        self.assertTrue(processor._cmd_missing_up_to_sphere("Player1", "1"))
+        self.assertEqual(processor.output.call_args.args[0].splitlines()[:2],
+                         ["Missing: Eleven (sphere 0)", "Missing: Twelve (sphere 1)"])
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.send_items_delay = 0.01
+        self.client = Client(mock.MagicMock(), self.ctx)
+        self.client.team, self.client.slot = 0, 1
+        self.other_client = Client(mock.MagicMock(), self.ctx)
+        self.other_client.team, self.other_client.slot = 0, 2
+        self.ctx.clients = {0: {1: [self.client], 2: [self.other_client]}}
+        self.sent: list[tuple[Client, list[dict]]] = []
+
+        async def send_msgs(endpoint: Client, msgs: list[dict]) -> bool:
+            self.sent.append((endpoint, msgs))
+            return True
+        self.ctx.send_msgs = send_msgs
+
+    async def test_coalesce(self) -> None:
+        """Tests that items received in quick succession are sent as one ReceivedItems to only their slot"""
+        send_items_to(self.ctx, 0, 1, NetworkItem(1, 2, 2, 0))
+        send_new_items(self.ctx)
+        send_items_to(self.ctx, 0, 1, NetworkItem(3, 4, 2, 0))
+        send_new_items(self.ctx)
+        self.assertFalse(self.sent)
+
+        await asyncio.sleep(self.ctx.send_items_delay * 5)
+        self.assertEqual(len(self.sent), 1)
+        client, msgs = self.sent[0]
+        self.assertIs(client, self.client)
+        self.assertEqual(msgs, [{"cmd": "ReceivedItems", "index": 0,
+                                 "items": [NetworkItem(1, 2, 2, 0), NetworkItem(3, 4, 2, 0)]}])
+        self.assertEqual(self.client.send_index, 2)
+
+        send_new_items(self.ctx)
+        await asyncio.sleep(self.ctx.send_items_delay * 5)
+        self.assertEqual(len(self.sent), 1, "nothing new was received")
+
+
+class TestBroadcast(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+
+    async def test_encode_once(self) -> None:
+        """Tests that a broadcast is handed to websockets once for all open connections and counts the savings"""
+        clients = [Client(mock.MagicMock(), self.ctx) for _ in range(3)]
+        for client in clients:
+            client.socket.transport.get_write_buffer_size.return_value = 0
+        clients[2].socket.open = False
+        with mock.patch("websockets.broadcast") as broadcast:
+            await self.ctx.broadcast_send_encoded_msgs(clients, "[{}]")
+        broadcast.assert_called_once_with([clients[0].socket, clients[1].socket], "[{}]")
+        self.assertEqual(self.ctx.broadcast_count, 1)
+        self.assertEqual(self.ctx.broadcast_encoded_size, 4)
+        self.assertEqual(self.ctx.broadcast_saved_size, 4)
+
+
+class TestRateLimit(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.client_rate_limits = {"Bounce": 10, "Set": 10}
+        self.ctx.client_rate_burst = 0.5
+        self.client = Client(mock.MagicMock(), self.ctx)
+
+    def test_token_bucket(self) -> None:
+        bucket = TokenBucket(10, 2, 0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertAlmostEqual(bucket.take(0), 0.1)
+        self.assertAlmostEqual(bucket.take(0.1), 0.1)
+        self.assertEqual(bucket.take(1), 0)
+
+    async def test_throttle(self) -> None:
+        """Tests that limited commands are throttled per kind once their burst is used up"""
+        with mock.patch("asyncio.sleep") as sleep:
+            for _ in range(5):
+                await self.ctx.throttle(self.client, {"cmd": "Bounce"})
+            sleep.assert_not_called()
+            await self.ctx.throttle(self.client, {"cmd": "Set"})
+            await self.ctx.throttle(self.client, {"cmd": "Unknown"})
+            await self.ctx.throttle(self.client, "not a command")
+            for _ in range(10):
+                await self.ctx.throttle(self.client, {"cmd": "Get"})
+            sleep.assert_not_called()
+            await self.ctx.throttle(self.client, {"cmd": "Bounce"})
+            sleep.assert_called_once()
+        self.assertEqual(self.ctx.throttled_commands, {"Bounce": 1})
+        self.assertEqual(set(self.client.rate_buckets), {"Bounce", "Set"})
+
+    async def test_throttle_disabled(self) -> None:
+        """Tests that clients are not rate limited by default"""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        with mock.patch("asyncio.sleep") as sleep:
+            for _ in range(100):
+                await ctx.throttle(self.client, {"cmd": "Bounce"})
+            sleep.assert_not_called()
+
+    def test_get_client_rate_limits(self) -> None:
+        """Tests that rate limits from the command line add to the ones from settings and can disable them"""
+        limits = get_client_rate_limits({"Bounce": 100, "Set": 10}, [("Set", "0"), ("Get", "5.5")])
+        self.assertEqual(limits, {"Bounce": 100, "Get": 5.5})
+        with self.assertRaises(ValueError):
+            get_client_rate_limits({"Bonuce": 100})
+
+    def test_send_buffer_limit(self) -> None:
+        """Tests that clients that don't keep up with outgoing messages are disconnected"""
+        self.client.socket.transport.get_write_buffer_size.return_value = self.ctx.client_send_buffer_limit
+        self.assertTrue(self.ctx.can_send(self.client))
+        self.client.socket.transport.get_write_buffer_size.return_value = self.ctx.client_send_buffer_limit + 1
+        self.assertFalse(self.ctx.can_send(self.client))
+        self.client.socket.transport.abort.assert_called_once()
+        self.assertEqual(self.ctx.send_buffer_disconnects, 1)
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+
+    async def test_metrics(self) -> None:
+        """Tests that metrics are served in Prometheus text format at /metrics only, with the token"""
+        self.ctx.endpoints.append(Client(mock.MagicMock(), self.ctx))
+        self.ctx.received_commands.update(["Bounce", "Bounce", ""])
+        self.ctx.dumper([{"cmd": "Bounce"}])
+        self.ctx.metrics_enabled = True
+        self.ctx.stored_data["key"] = "value"
+        self.ctx.record_save(0.5, 100)
+        # legacy websockets server hook arguments
+        process_request = metrics_request_handler(self.ctx, "secret")
+        self.assertIsNone(await process_request("/", {}))
+        self.assertEqual((await process_request("/metrics", {}))[0], 401)
+        self.assertEqual((await process_request("/metrics", {"Authorization": "Bearer wrong"}))[0], 401)
+        status, headers, body = await process_request("/metrics", {"Authorization": "Bearer secret"})
+        self.assertEqual(status, 200)
+        lines = body.decode().splitlines()
+        self.assertIn('archipelago_clients{authenticated="false"} 1.0', lines)
+        self.assertIn('archipelago_commands_received_total{cmd="Bounce"} 2.0', lines)
+        self.assertIn('archipelago_commands_received_total{cmd="other"} 1.0', lines)
+        self.assertIn("# TYPE archipelago_encode_seconds_total counter", lines)
+        self.assertIn("archipelago_save_size_bytes 100.0", lines)
+        self.assertIn(f"archipelago_datastorage_size_bytes {float(self.ctx.stored_data_size)!r}", lines)
+        self.assertGreater(self.ctx.stored_data_size, 0)
+        self.assertGreater(self.ctx.encode_time, 0)
+
+    async def test_metrics_http(self) -> None:
+        """Tests that a real websocket server answers plain HTTP GET /metrics, and expects websockets elsewhere"""
+        async def get(path: str, token: str = "secret") -> bytes:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+                         f"Connection: close\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response
+
+        self.ctx.received_commands.update(["Bounce"])
+        server = await websockets.serve(functools.partial(MultiServer.server, ctx=self.ctx), "127.0.0.1", 0,
+                                        process_request=metrics_request_handler(self.ctx, "secret"))
+        try:
+            port = server.sockets[0].getsockname()[1]
+            response = await get("/metrics")
+            head, body = response.split(b"\r\n\r\n", 1)
+            self.assertTrue(head.startswith(b"HTTP/1.1 200"), head)
+            self.assertIn(b"Content-Type: text/plain; version=0.0.4; charset=utf-8", head)
+            self.assertIn(b'archipelago_commands_received_total{cmd="Bounce"} 1.0', body)
+            self.assertFalse((await get("/")).startswith(b"HTTP/1.1 200"))
+            self.assertTrue((await get("/metrics", "wrong")).startswith(b"HTTP/1.1 401"))
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+class TestDataStorage(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.save = mock.MagicMock()
+        self.client = Client(mock.MagicMock(), self.ctx)
+        self.client.auth = True
+        self.client.team, self.client.slot = 0, 1
+        self.sent: list[list[dict]] = []
+
+        async def send_msgs(endpoint: Client, msgs: list[dict]) -> bool:
+            self.sent.append(msgs)
+            return True
+        self.ctx.send_msgs = send_msgs
+
+    async def test_prefix_get(self) -> None:
+        """Tests that Get returns keys matching a prefix, including ones written without set_stored_data"""
+        for key in ("tracker_1", "tracker_2", "trackers", "other"):
+            await process_client_cmd(self.ctx, self.client,
+                                     {"cmd": "Set", "key": key, "operations": [{"operation": "replace", "value": 1}]})
+        self.ctx.stored_data["tracker_3"] = 3
+        await process_client_cmd(self.ctx, self.client, {"cmd": "Get", "prefixes": ["tracker_"], "keys": ["other"]})
+        self.assertEqual(self.sent[-1][0]["keys"], {"other": 1, "tracker_1": 1, "tracker_2": 1, "tracker_3": 3})
+        self.assertEqual(self.ctx.stored_data_writers["tracker_1"], 1)
+
+        await process_client_cmd(self.ctx, self.client, {"cmd": "Get", "prefixes": [1]})
+        self.assertEqual(self.sent[-1][0]["cmd"], "InvalidPacket")
+
+    async def test_prefix_notify(self) -> None:
+        """Tests that SetNotify with prefixes notifies of keys that didn't exist yet, and only once per client"""
+        listener = Client(mock.MagicMock(), self.ctx)
+        self.ctx.add_stored_data_notification(listener, ["pos_1"], ["pos_"])
+        self.assertEqual(self.ctx.get_stored_data_targets("pos_1"), {listener})
+        self.assertEqual(self.ctx.get_stored_data_targets("pos_2"), {listener})
+        self.assertEqual(self.ctx.get_stored_data_targets("other"), set())
+        self.assertEqual(self.ctx.get_stored_data_targets("pos"), set())
+
+    async def test_prefix_notify_cleanup(self) -> None:
+        """Tests that subscriptions of disconnected clients are removed and empty prefixes are rejected"""
+        listener = Client(mock.MagicMock(), self.ctx)
+        self.ctx.add_stored_data_notification(listener, ["pos_1"], ["pos_", "p"])
+        self.assertEqual(self.ctx.stored_data_prefix_lengths, [1, 4])
+        del listener
+        gc.collect()
+        self.assertEqual(self.ctx.get_stored_data_targets("pos_1"), set())
+        self.assertEqual(self.ctx.stored_data_notification_clients, {})
+        self.assertEqual(self.ctx.stored_data_prefix_notification_clients, {})
+        self.assertEqual(self.ctx.stored_data_prefix_lengths, [])
+
+        for cmd in ("Get", "SetNotify"):
+            await process_client_cmd(self.ctx, self.client, {"cmd": cmd, "prefixes": [""]})
+            self.assertEqual(self.sent[-1][0]["cmd"], "InvalidPacket")
+        self.assertEqual(self.ctx.stored_data_prefix_notification_clients, {})
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.save_filename = os.path.join(self.tempdir.name, "test.apsave")
+        self.contexts: list[Context] = []
+        # the data package is shared by all contexts of a process and not needed for saving
+        patcher = mock.patch.object(Context, "_load_game_data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        for ctx in self.contexts:
+            if ctx.journal_file:
+                ctx.journal_file.close()
+        self.tempdir.cleanup()
+
+    def load(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.saving = True
+        ctx.save_filename = self.save_filename
+        ctx._load_save_file()
+        self.contexts.append(ctx)
+        return ctx
+
+    def test_replay(self) -> None:
+        """Tests that changes journaled by save() are restored without writing a new snapshot"""
+        ctx = self.load()
+        self.assertFalse(os.path.exists(self.save_filename))
+        send_items_to(ctx, 0, 1, NetworkItem(1, 2, 2, 0), NetworkItem(3, 4, 2, 0))
+        ctx.location_checks[0, 2] |= {2, 4}
+        ctx.journal("location_checks", (0, 2), {2, 4})
+        ctx.stored_data["key"] = [1]
+        ctx.journal("stored_data", "key", [1])
+        ctx.client_game_state[0, 1] = ClientStatus.CLIENT_GOAL
+        ctx.journal("client_game_state", (0, 1), ClientStatus.CLIENT_GOAL)
+        self.assertTrue(ctx.save())
+        self.assertFalse(ctx.save_dirty, "a small journal should not need a snapshot")
+        self.assertFalse(os.path.exists(self.save_filename))
+
+        loaded = self.load()
+        self.assertEqual(loaded.received_items, ctx.received_items)
+        self.assertEqual(loaded.location_checks[0, 2], {2, 4})
+        self.assertEqual(loaded.stored_data, {"key": [1]})
+        self.assertEqual(loaded.client_game_state[0, 1], ClientStatus.CLIENT_GOAL)
+        self.assertTrue(os.path.exists(self.save_filename), "replaying a journal should compact it")
+
+    def test_snapshot_while_journaling(self) -> None:
+        """Tests that a snapshot taken right when a change is journaled still includes the change"""
+        ctx = self.load()
+        journal = ctx.journal
+
+        def journal_and_snapshot(section: str, key: object, value: object) -> None:
+            journal(section, key, value)
+            ctx.save(True)
+
+        with mock.patch.object(ctx, "journal", journal_and_snapshot):
+            send_items_to(ctx, 0, 1, NetworkItem(1, 2, 2, 0))
+        self.assertEqual(self.load().received_items, ctx.received_items)
+
+    def test_compaction(self) -> None:
+        """Tests that a snapshot replaces the journal and a stale journal is not replayed on top of it"""
+        ctx = self.load()
+        send_items_to(ctx, 0, 1, NetworkItem(1, 2, 2, 0))
+        ctx.stored_data["key"] = 1
+        ctx.journal("stored_data", "key", 1)
+        ctx.save()
+        with open(ctx.journal_filename, "rb") as f:
+            stale_journal = f.read()
+        self.assertTrue(ctx.save(True))
+        send_items_to(ctx, 0, 1, NetworkItem(3, 4, 2, 0))
+        ctx.stored_data["key"] = 2
+        ctx.journal("stored_data", "key", 2)
+        ctx.save()
+        with open(ctx.journal_filename, "ab") as f:
+            f.write(b"\x80\x04\x95")  # torn record
+        loaded = self.load()
+        self.assertEqual(loaded.received_items, ctx.received_items)
+        self.assertEqual(loaded.stored_data["key"], 2)
+
+        loaded.journal_file.close()
+        with open(loaded.journal_filename, "wb") as f:
+            f.write(stale_journal)
+        reloaded = self.load()
+        self.assertEqual(reloaded.received_items, ctx.received_items)
+        self.assertEqual(reloaded.stored_data["key"], 2)
+
+    def test_timers(self) -> None:
+        """Tests that client timers are journaled and other changes to snapshot-only data mark the save dirty"""
+        ctx = self.load()
+        set_connection_timer(ctx, 0, 1)
+        self.assertFalse(ctx.save_dirty)
+        loaded = self.load()
+        self.assertEqual(loaded.client_connection_timers[0, 1], ctx.client_connection_timers[0, 1])
+
+        ServerCommandProcessor(ctx)._cmd_option("hint_cost", "5")
+        self.assertTrue(ctx.save_dirty)
+
+    def test_batched_flush(self) -> None:
+        """Tests that saves requested during one event loop iteration write the journal once"""
+        ctx = self.load()
+
+        async def save_twice() -> None:
+            with mock.patch.object(ctx, "_flush_journal", wraps=ctx._flush_journal) as flush:
+                ctx.stored_data["key"] = 1
+                ctx.journal("stored_data", "key", 1)
+                ctx.save()
+                ctx.stored_data["key"] = 2
+                ctx.journal("stored_data", "key", 2)
+                ctx.save()
+                flush.assert_not_called()
+                await asyncio.sleep(0)
+                flush.assert_called_once()
+
+        asyncio.run(save_twice())
+        self.assertFalse(ctx.save_dirty)
+        self.assertEqual(self.load().stored_data["key"], 2)
@@ -1,19 +1,22 @@
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
 import hashlib
 import logging
 import pathlib
 import sys
+import threading
 import time
 from collections.abc import Callable, Iterable, Mapping
 from random import Random
-from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, TextIO, Tuple,
+from typing import (Any, ClassVar, Dict, FrozenSet, Iterator, List, Optional, Self, Set, TextIO, Tuple,
                     TYPE_CHECKING, Type, Union)
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState, Entrance
 from rule_builder.rules import CustomRuleRegister, Rule
-from Utils import Version
+from Utils import DaemonThreadPoolExecutor, Version
 
 if TYPE_CHECKING:
     from BaseClasses import CollectionRule, Item, Location, MultiWorld, Region, Tutorial
@@ -165,11 +168,99 @@ class WebWorldRegister(type):
         return super().__new__(mcs, name, bases, dct)
 
 
+def _peak_rss() -> Optional[int]:
+    """Peak resident set size of this process so far in bytes, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class GenerationProfiler:
+    """
+    Collects wall time, CPU time and call counts of generation stages, per stage and per world. The process only
+    reports its peak RSS so far, so stages record how much they raised it and the peak of the run is reported once.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        """generation stages timed by Main, such as fill or progression balancing"""
+        self.players: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        """world method calls per player, keyed by method name"""
+        self.world_types: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        """stage_ classmethod calls per game, keyed by method name"""
+
+    @staticmethod
+    def _add(entries: Dict[str, Dict[str, Any]], name: str, wall: float, cpu: float) -> None:
+        entry = entries.setdefault(name, {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0})
+        entry["wall_time"] += wall
+        entry["cpu_time"] += cpu
+        entry["calls"] += 1
+
+    def record_stage(self, name: str, wall: float, cpu: float, peak_rss_growth: Optional[int] = None) -> None:
+        with self._lock:
+            self._add(self.stages, name, wall, cpu)
+            if peak_rss_growth is not None:
+                entry = self.stages[name]
+                entry["peak_rss_growth"] = entry.get("peak_rss_growth", 0) + peak_rss_growth
+
+    def record_call(self, method: Callable[..., Any], wall: float, cpu: float,
+                    player: Optional[int] = None) -> None:
+        with self._lock:
+            if player:
+                self._add(self.players.setdefault(player, {}), method.__name__, wall, cpu)
+            else:
+                game = getattr(getattr(method, "__self__", None), "game", method.__qualname__.split(".")[0])
+                self._add(self.world_types.setdefault(game, {}), method.__name__, wall, cpu)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the body as generation stage `name`. CPU time is counted for the whole process."""
+        start, start_cpu, start_rss = time.perf_counter(), time.process_time(), _peak_rss()
+        try:
+            yield
+        finally:
+            end_rss = _peak_rss()
+            self.record_stage(name, time.perf_counter() - start, time.process_time() - start_cpu,
+                              None if start_rss is None or end_rss is None else end_rss - start_rss)
+
+    def to_dict(self, multiworld: "MultiWorld") -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "seed_name": multiworld.seed_name,
+                "peak_rss": _peak_rss(),
+                "stages": self.stages,
+                "players": {
+                    player: {
+                        "name": multiworld.player_name[player],
+                        "game": multiworld.game[player],
+                        "calls": calls,
+                    }
+                    for player, calls in sorted(self.players.items())
+                },
+                "world_types": self.world_types,
+            }
+
+
+def profile_stage(multiworld: "MultiWorld", name: str) -> contextlib.AbstractContextManager[None]:
+    """Time the body as generation stage `name` if the multiworld is being profiled."""
+    if multiworld.profiler:
+        return multiworld.profiler.stage(name)
+    return contextlib.nullcontext()
+
+
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
     start = time.perf_counter()
+    start_cpu = time.thread_time()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if multiworld and multiworld.profiler:
+        # world calls may run in output threads, so only count the CPU time of this thread
+        multiworld.profiler.record_call(method, taken, time.thread_time() - start_cpu, player)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -199,19 +290,58 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
+concurrent_stage_methods = frozenset({"generate_early", "create_regions", "create_items", "set_rules"})
+"""Stages that run concurrently for worlds with World.concurrent_stages, when MultiWorld.stage_workers is above 1"""
+
+_stage_executors: Dict[int, concurrent.futures.ThreadPoolExecutor] = {}
+
+
+def _check_new_items(multiworld: "MultiWorld", player: int, new_items: List["Item"]) -> None:
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
+def _call_concurrently(multiworld: "MultiWorld", method_name: str, players: List[int], *args: Any) -> None:
+    """
+    Calls method_name of the worlds of players on stage worker threads. Global random state is removed meanwhile, and
+    the items added to the item pool are put in player order, so the result does not depend on thread timing.
+    """
+    workers = multiworld.stage_workers
+    executor = _stage_executors.get(workers)
+    if executor is None:
+        executor = _stage_executors[workers] = DaemonThreadPoolExecutor(workers, "Stage")
+    prev_item_count = len(multiworld.itempool)
+    multiworld.random.passthrough = False
+    try:
+        futures = [executor.submit(call_single, multiworld, method_name, player, *args) for player in players]
+        concurrent.futures.wait(futures)
+    finally:
+        multiworld.random.passthrough = True
+    for future in futures:
+        future.result()  # raise the exception of the first failing player
+    new_items = sorted(multiworld.itempool[prev_item_count:], key=lambda item: item.player)
+    multiworld.itempool[prev_item_count:] = new_items
+    if __debug__:
+        for player in players:
+            _check_new_items(multiworld, player, [item for item in new_items if item.player == player])
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
-    world_types: Set[AutoWorldRegister] = set()
-    for player in multiworld.player_ids:
+    players: Iterable[int] = multiworld.player_ids
+    if multiworld.stage_workers > 1 and method_name in concurrent_stage_methods:
+        concurrent_players = [player for player in players if multiworld.worlds[player].concurrent_stages]
+        if len(concurrent_players) > 1:
+            _call_concurrently(multiworld, method_name, concurrent_players, *args)
+            players = [player for player in players if not multiworld.worlds[player].concurrent_stages]
+
+    for player in players:
         prev_item_count = len(multiworld.itempool)
-        world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _check_new_items(multiworld, player, multiworld.itempool[prev_item_count:])
 
     call_stage(multiworld, method_name, *args)
 
@@ -221,7 +351,7 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -321,11 +451,26 @@ class World(metaclass=AutoWorldRegister):
     origin_region_name: str = "Menu"
     """Name of the Region from which accessibility is tested."""
 
+    concurrent_stages: ClassVar[bool] = False
+    """If True, generate_early, create_regions, create_items and set_rules only touch this world's own player, and only
+    use world.random, so they may run concurrently with other worlds' when MultiWorld.stage_workers is above 1."""
+
     explicit_indirect_conditions: bool = True
     """If True, the world implementation is supposed to use MultiWorld.register_indirect_condition() correctly.
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    incremental_reachability: bool = False
+    """If True, blocked entrances with a rule builder access rule that only depends on items are only rechecked when
+    one of those items changes, instead of on every region update. Entrances with any other access rule are still
+    rechecked every time. Requires the world to only change CollectionState.prog_items through
+    CollectionState.add_item, remove_item and set_item."""
+
+    compact_prog_items: bool = False
+    """If True, this world's CollectionState.prog_items are an ItemCounts array instead of a Counter. This makes state
+    copies and item group checks cheaper, but only supports integer counts and the mapping interface of Counter, not
+    its arithmetic."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
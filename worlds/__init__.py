@@ -10,11 +10,16 @@ import dataclasses
 import json
 from pathlib import Path
 from types import ModuleType
-from typing import List, Sequence
+from typing import TYPE_CHECKING, Any, Iterable, List, Mapping, Sequence
 from zipfile import ZipFile, BadZipFile
 
-from NetUtils import DataPackage
-from Utils import local_path, user_path, Version, version_tuple, tuplize_version, messagebox
+from NetUtils import DataPackage, GamesPackage
+from Utils import (cache_path, local_path, user_path, Version, version_tuple, tuplize_version, messagebox,
+                   get_file_safe_name)
+
+if TYPE_CHECKING:
+    from .AutoWorld import World
+    from .Files import APWorldContainer
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -30,10 +35,15 @@ __all__ = [
     "local_folder",
     "user_folder",
     "failed_world_loads",
+    "load_worlds",
+    "load_data_packages",
+    "hint_blacklists",
 ]
 
 
 failed_world_loads: dict[str, str] = {}
+# hint blacklists of games whose data package was read from the cache or loaded by load_data_packages
+hint_blacklists: dict[str, frozenset[str]] = {}
 
 logger = logging.getLogger("Worlds")
 logger.propagate = False
@@ -46,6 +56,9 @@ class WorldSource:
     relative: bool = True  # relative to regular world import folder
     time_taken: float = -1.0
     version: Version = Version(0, 0, 0)
+    game: str | None = dataclasses.field(default=None, compare=False)  # None until known from manifest or import
+    manifest: dict[str, Any] = dataclasses.field(default_factory=dict, compare=False)  # only for folder worlds
+    loaded: bool = dataclasses.field(default=False, compare=False)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.path}, is_zip={self.is_zip}, relative={self.relative})"
@@ -57,6 +70,7 @@ class WorldSource:
         return self.path
 
     def load(self) -> bool:
+        self.loaded = True
         try:
             start = time.perf_counter()
             importlib.import_module(f".{self.name}", "worlds")
@@ -87,6 +101,9 @@ _test_worlds_env = os.environ.get("AP_TEST_WORLDS") if "pytest" in sys.modules o
 _requested_worlds = {name.strip() for name in _test_worlds_env.split(",") if name.strip()} if _test_worlds_env else None
 test_worlds_filter = _requested_worlds | _SUITE_FIXTURE_WORLDS if _requested_worlds else None
 
+# AP_LAZY_WORLDS=1 only imports generic here, other worlds get imported when asked for through load_worlds
+lazy_worlds = os.environ.get("AP_LAZY_WORLDS") == "1"
+
 # find potential world containers, currently folders and zip-importable .apworld's
 logger.info("Indexing worlds")
 world_sources: List[WorldSource] = []
@@ -107,132 +124,395 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
                     logging.warning(f"excluding {entry.name} from world sources because it has no __init__.py")
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
-
-# import all submodules to trigger AutoWorldRegister
-logger.info("Processing found worlds")
 world_sources.sort()
-apworlds: list[WorldSource] = []
+
+
+# Folder worlds are indexed by game and manifest in a cache, so finding a world doesn't need to import it or walk it.
+# Entries are keyed by path and only reused while the world's folder, __init__ and manifest are unchanged.
+# Apworlds are indexed by game while the zip is unchanged.
+# Once imported, a world's data package is stored next to the index, and its checksum recorded in the index along with
+# a stamp of all the world's files, so lazy runs can read it instead of importing the world.
+# These are kept apart from the data packages clients receive from servers, which lack the groups.
+_world_index_path = cache_path("worlds_index.json")
+_world_index_version = 2
+
+
+def _read_world_index() -> dict[str, dict[str, Any]]:
+    if os.path.isfile(_world_index_path):
+        try:
+            with open(_world_index_path, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+            if index.get("version") == _world_index_version and index.get("core_version") == list(version_tuple):
+                return index["worlds"]
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Ignoring invalid world index {_world_index_path}.")
+    return {}
+
+
+def _write_world_index() -> None:
+    global _world_index_changed
+    if not _world_index_changed:
+        return
+    try:
+        os.makedirs(os.path.dirname(_world_index_path), exist_ok=True)
+        with open(_world_index_path + ".tmp", "w", encoding="utf-8") as index_file:
+            json.dump({"version": _world_index_version, "core_version": list(version_tuple),
+                       "worlds": _world_index}, index_file)
+        os.replace(_world_index_path + ".tmp", _world_index_path)
+    except OSError as e:  # a missing index only costs time
+        logger.warning(f"Could not write world index: {e}")
+    _world_index_changed = False
+
+
+def _folder_stamp(path: str, manifest_path: str | None) -> list[int]:
+    init_path = os.path.join(path, "__init__.py")
+    if not os.path.isfile(init_path):
+        init_path = os.path.join(path, "__init__.pyc")
+    stamp = [os.stat(path).st_mtime_ns, os.stat(init_path).st_mtime_ns]
+    if manifest_path:
+        stamp.append(os.stat(os.path.join(path, manifest_path)).st_mtime_ns)
+    return stamp
+
+
+def _tree_stamp(source: WorldSource) -> list[int]:
+    """Stamp of all files of a world, to tell if its data package may have changed."""
+    path = source.resolved_path
+    if source.is_zip:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    count = latest = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [dirname for dirname in dirnames if dirname != "__pycache__"]
+        for file in filenames:
+            count += 1
+            latest = max(latest, os.stat(os.path.join(dirpath, file)).st_mtime_ns)
+    return [count, latest]
+
+
+def _find_manifest(path: str) -> str | None:
+    """Find the archipelago.json of a folder world, relative to its folder."""
+    if os.path.isfile(os.path.join(path, "archipelago.json")):
+        return "archipelago.json"
+    for dirpath, dirnames, filenames in os.walk(path):
+        for file in filenames:
+            if file.endswith("archipelago.json"):
+                return os.path.relpath(os.path.join(dirpath, file), path)
+    return None
+
+
+def _index_folder_world(source: WorldSource) -> None:
+    global _world_index_changed
+    path = source.resolved_path
+    entry = _world_index.get(path)
+    try:
+        if entry and entry["stamp"] == _folder_stamp(path, entry["manifest_path"]):
+            source.manifest = entry["manifest"]
+            source.game = entry["game"]
+            return
+    except OSError:
+        pass  # manifest was removed
+    manifest_path = _find_manifest(path)
+    manifest = {}
+    if manifest_path:
+        with open(os.path.join(path, manifest_path), mode="r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    source.manifest = manifest
+    source.game = manifest.get("game")
+    _world_index[path] = {"stamp": _folder_stamp(path, manifest_path), "manifest_path": manifest_path,
+                          "manifest": manifest, "game": source.game}
+    _world_index_changed = True
+
+
+def _index_apworld(source: WorldSource) -> None:
+    global _world_index_changed
+    path = source.resolved_path
+    entry = _world_index.get(path)
+    stamp = _tree_stamp(source)
+    if entry and entry["stamp"] == stamp:
+        source.game = entry["game"]
+        return
+    _world_index[path] = {"stamp": stamp, "game": None}
+    _world_index_changed = True
+
+
+_world_index = _read_world_index()
+_world_index_changed = False
 for world_source in world_sources:
-    # load all loose files first:
     if world_source.is_zip:
-        apworlds.append(world_source)
+        _index_apworld(world_source)
     else:
-        logger.info(world_source.name)
-        world_source.load()
+        _index_folder_world(world_source)
 
 from .AutoWorld import AutoWorldRegister
 
-for world_source in world_sources:
-    if not world_source.is_zip:
-        # look for manifest
-        manifest = {}
-        for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
-            for file in filenames:
-                if file.endswith("archipelago.json"):
-                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
-                        manifest = json.load(manifest_file)
-                    break
-            if manifest:
-                break
-        game = manifest.get("game")
+
+def _apply_folder_manifests(sources: Sequence[WorldSource]) -> None:
+    for source in sources:
+        game = source.manifest.get("game")
         if game in AutoWorldRegister.world_types:
-            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
-            AutoWorldRegister.world_types[game].manifest = manifest
-
-if apworlds:
-    # encapsulation for namespace / gc purposes
-    def load_apworlds() -> None:
-        global apworlds
-        from .Files import APWorldContainer, InvalidDataError
-        core_compatible: list[tuple[WorldSource, APWorldContainer]] = []
-
-        def fail_world(game_name: str, reason: str, add_as_failed_to_load: bool = True) -> None:
-            if add_as_failed_to_load:
-                failed_world_loads[game_name] = reason
-            logging.warning(reason)
-
-        for apworld_source in apworlds:
-            logger.info(apworld_source.name)
-            apworld: APWorldContainer = APWorldContainer(apworld_source.resolved_path)
-            # populate metadata
-            try:
-                apworld.read()
-            except InvalidDataError as e:
-                if version_tuple < (0, 7, 0):
-                    logging.error(
-                        f"Invalid or missing manifest file for {apworld_source.resolved_path}. "
-                        "This apworld will stop working with Archipelago 0.7.0."
-                    )
-                    logging.error(e)
-                else:
-                    raise e
-            except BadZipFile as e:
-                err_message = (f"The world source {apworld_source.resolved_path} is not a valid zip. "
-                               "It is likely either corrupted, or was packaged incorrectly.")
+            AutoWorldRegister.world_types[game].world_version = tuplize_version(
+                source.manifest.get("world_version", "0.0.0"))
+            AutoWorldRegister.world_types[game].manifest = source.manifest
+
+
+def _record_games(sources: Sequence[WorldSource]) -> None:
+    """Remember the game of worlds that don't declare it in a manifest, to not have to import them next time."""
+    global _world_index_changed
+    unknown = {source.name: source for source in sources if source.game is None and not source.is_zip}
+    if not unknown:
+        return
+    for game, world in AutoWorldRegister.world_types.items():
+        module = world.__module__.split(".")
+        source = unknown.get(module[1], None) if module[0] == "worlds" and len(module) > 1 else None
+        if source and source.game is None:
+            source.game = game
+            entry = _world_index.get(source.resolved_path)
+            if entry:
+                entry["game"] = game
+                _world_index_changed = True
+
+
+apworld_module_specs: dict[str, importlib.machinery.ModuleSpec | None] = {}
+
+
+class APWorldModuleFinder(importlib.abc.MetaPathFinder):
+    def find_spec(
+            self, fullname: str, _path: Sequence[str] | None, _target: ModuleType = None
+    ) -> importlib.machinery.ModuleSpec | None:
+        return apworld_module_specs.get(fullname)
+
+
+def _read_apworld(apworld_source: WorldSource) -> "APWorldContainer":
+    global _world_index_changed
+    from .Files import APWorldContainer, InvalidDataError
+    apworld: APWorldContainer = APWorldContainer(apworld_source.resolved_path)
+    # populate metadata
+    try:
+        apworld.read()
+    except InvalidDataError as e:
+        if version_tuple < (0, 7, 0):
+            logging.error(
+                f"Invalid or missing manifest file for {apworld_source.resolved_path}. "
+                "This apworld will stop working with Archipelago 0.7.0."
+            )
+            logging.error(e)
+        else:
+            raise e
+    except BadZipFile as e:
+        err_message = (f"The world source {apworld_source.resolved_path} is not a valid zip. "
+                       "It is likely either corrupted, or was packaged incorrectly.")
+
+        if sys.stdout:
+            raise RuntimeError(err_message) from e
+        else:
+            messagebox("Couldn't load worlds", err_message, error=True)
+            sys.exit(1)
+    apworld_source.game = apworld.game
+    entry = _world_index.get(apworld_source.resolved_path)
+    if entry and entry["game"] != apworld.game:
+        entry["game"] = apworld.game
+        _world_index_changed = True
+    return apworld
+
+
+def _load_apworlds(apworlds: Sequence[WorldSource]) -> None:
+    from .Files import APWorldContainer
+    core_compatible: list[tuple[WorldSource, APWorldContainer]] = []
+
+    def fail_world(game_name: str, reason: str, add_as_failed_to_load: bool = True) -> None:
+        if add_as_failed_to_load:
+            failed_world_loads[game_name] = reason
+        logging.warning(reason)
+
+    for apworld_source in apworlds:
+        logger.info(apworld_source.name)
+        apworld_source.loaded = True
+        apworld = _read_apworld(apworld_source)
+
+        if apworld.minimum_ap_version and apworld.minimum_ap_version > version_tuple:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its minimum core version {apworld.minimum_ap_version} "
+                       f"is higher than current core version {version_tuple}.")
+        elif apworld.maximum_ap_version and apworld.maximum_ap_version < version_tuple:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its maximum core version {apworld.maximum_ap_version} "
+                       f"is lower than current core version {version_tuple}.")
+        else:
+            core_compatible.append((apworld_source, apworld))
+    # load highest version first
+    core_compatible.sort(
+        key=lambda element: element[1].world_version if element[1].world_version else Version(0, 0, 0),
+        reverse=True)
+
+    if not any(isinstance(finder, APWorldModuleFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, APWorldModuleFinder())
 
-                if sys.stdout:
-                    raise RuntimeError(err_message) from e
-                else:
-                    messagebox("Couldn't load worlds", err_message, error=True)
-                    sys.exit(1)
-
-            if apworld.minimum_ap_version and apworld.minimum_ap_version > version_tuple:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its minimum core version {apworld.minimum_ap_version} "
-                           f"is higher than current core version {version_tuple}.")
-            elif apworld.maximum_ap_version and apworld.maximum_ap_version < version_tuple:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its maximum core version {apworld.maximum_ap_version} "
-                           f"is lower than current core version {version_tuple}.")
-            else:
-                core_compatible.append((apworld_source, apworld))
-        # load highest version first
-        core_compatible.sort(
-            key=lambda element: element[1].world_version if element[1].world_version else Version(0, 0, 0),
-            reverse=True)
-
-        apworld_module_specs = {}
-        class APWorldModuleFinder(importlib.abc.MetaPathFinder):
-            def find_spec(
-                    self, fullname: str, _path: Sequence[str] | None, _target: ModuleType = None
-            ) -> importlib.machinery.ModuleSpec | None:
-                return apworld_module_specs.get(fullname)
+    for apworld_source, apworld in core_compatible:
+        if apworld.game and apworld.game in AutoWorldRegister.world_types:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its game {apworld.game} is already loaded.",
+                       add_as_failed_to_load=False)
+        else:
+            importer = zipimport.zipimporter(apworld_source.resolved_path)
+            world_name = Path(apworld.path).stem
+
+            spec = importer.find_spec(f"worlds.{world_name}")
+            apworld_module_specs[f"worlds.{world_name}"] = spec
+
+            apworld_source.load()
+            if apworld.game in AutoWorldRegister.world_types:
+                # world could fail to load at this point
+                if apworld.world_version:
+                    AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
+
+                assert apworld.path
+                with ZipFile(apworld.path, "r") as zf:
+                    manifest = apworld.read_contents(zf)
+                # version/compatible_version shouldn't be needed by world, makes it consistent with folder world
+                manifest.pop("version", None)
+                manifest.pop("compatible_version", None)
+                AutoWorldRegister.world_types[apworld.game].manifest = manifest
+
+
+def _load_sources(sources: Sequence[WorldSource]) -> None:
+    # load all loose files first:
+    folders = [source for source in sources if not source.is_zip]
+    for world_source in folders:
+        logger.info(world_source.name)
+        world_source.load()
+    _apply_folder_manifests(folders)
+    apworlds = [source for source in sources if source.is_zip]
+    if apworlds:
+        _load_apworlds(apworlds)
+    _record_games(folders)
+    _write_world_index()
+
+
+def _world_of_source(source: WorldSource) -> "type[World] | None":
+    """The world type imported from source, if any."""
+    world = AutoWorldRegister.world_types.get(source.game) if source.loaded and source.game else None
+    if world is None:
+        return None
+    module = world.__module__.split(".")
+    return world if module[0] == "worlds" and len(module) > 1 and module[1] == source.name else None
+
+
+def _data_package_path(game: str, checksum: str) -> str:
+    return cache_path("world_data_packages", get_file_safe_name(game), f"{get_file_safe_name(checksum)}.json")
+
+
+def _store_data_package(game: str, package: GamesPackage) -> None:
+    path = _data_package_path(game, package["checksum"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as package_file:
+        json.dump(package, package_file, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def _cache_data_packages(packages: Mapping[str, GamesPackage]) -> None:
+    """Store the data packages of imported worlds that changed since they were last cached."""
+    global _world_index_changed
+    for source in world_sources:
+        entry = _world_index.get(source.resolved_path)
+        world = _world_of_source(source)
+        if entry is None or world is None or world.game not in packages:
+            continue
+        package = packages[world.game]
+        try:
+            stamp = _tree_stamp(source)
+        except OSError:
+            continue
+        cached = entry.get("data_package")
+        if cached and cached["checksum"] == package["checksum"] and cached["stamp"] == stamp:
+            continue
+        try:
+            _store_data_package(world.game, package)
+        except OSError as e:
+            logger.warning(f"Could not store data package of {world.game}: {e}")
+            continue
+        entry["data_package"] = {"stamp": stamp, "checksum": package["checksum"],
+                                 "hint_blacklist": sorted(world.hint_blacklist)}
+        _world_index_changed = True
+    _write_world_index()
+
+
+def _read_cached_data_package(source: WorldSource) -> GamesPackage | None:
+    """The cached data package of an unloaded world, if its files didn't change since it was cached."""
+    cached = _world_index.get(source.resolved_path, {}).get("data_package")
+    if source.loaded or source.game is None or not cached:
+        return None
+    try:
+        if cached["stamp"] != _tree_stamp(source):
+            return None
+    except OSError:
+        return None
+    try:
+        with open(_data_package_path(source.game, cached["checksum"]), encoding="utf-8") as package_file:
+            package = json.load(package_file)
+    except (OSError, ValueError):
+        return None
+    if package.get("checksum") != cached["checksum"]:
+        return None
+    hint_blacklists[source.game] = frozenset(cached["hint_blacklist"])
+    return package
+
+
+def load_worlds(games: Iterable[str] | None = None) -> dict[str, "type[World]"]:
+    """
+    Import the worlds of games, or all worlds if games is None, that aren't loaded yet.
+    Only needed with AP_LAZY_WORLDS, as all worlds are loaded on import otherwise.
+    Worlds whose game isn't known from a manifest or an earlier import are always imported.
+
+    :return: the newly loaded world types by game
+    """
+    already_loaded = set(AutoWorldRegister.world_types)
+    if games is None:
+        sources = [source for source in world_sources if not source.loaded]
+    else:
+        wanted = set(games) - already_loaded
+        if not wanted:
+            return {}
+        for source in world_sources:
+            if source.is_zip and source.game is None and not source.loaded:
+                _read_apworld(source)
+        sources = [source for source in world_sources
+                   if not source.loaded and (source.game is None or source.game in wanted)]
+    if sources:
+        _load_sources(sources)
+    new_worlds = {game: world for game, world in AutoWorldRegister.world_types.items() if game not in already_loaded}
+    new_packages = {world_name: world.get_data_package_data() for world_name, world in new_worlds.items()}
+    network_data_package["games"].update(new_packages)
+    _cache_data_packages(new_packages)
+    return new_worlds
+
+
+def load_data_packages(games: Iterable[str]) -> dict[str, GamesPackage]:
+    """
+    Get the data packages of games, adding them to network_data_package.
+    Packages of unloaded worlds are read from the data package cache if the world didn't change since it was last
+    imported, otherwise the world is imported. Their hint blacklist is added to hint_blacklists.
+
+    :return: the data packages of the games that have a world
+    """
+    games = set(games)
+    packages = network_data_package["games"]
+    for source in world_sources:
+        if source.game in games and source.game not in packages:
+            package = _read_cached_data_package(source)
+            if package is not None:
+                packages[source.game] = package
+    load_worlds(games - packages.keys())
+    for game in games & AutoWorldRegister.world_types.keys():
+        hint_blacklists.setdefault(game, frozenset(AutoWorldRegister.world_types[game].hint_blacklist))
+    return {game: packages[game] for game in games if game in packages}
 
-        sys.meta_path.insert(0, APWorldModuleFinder())
 
-        for apworld_source, apworld in core_compatible:
-            if apworld.game and apworld.game in AutoWorldRegister.world_types:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its game {apworld.game} is already loaded.",
-                           add_as_failed_to_load=False)
-            else:
-                importer = zipimport.zipimporter(apworld_source.resolved_path)
-                world_name = Path(apworld.path).stem
-
-                spec = importer.find_spec(f"worlds.{world_name}")
-                apworld_module_specs[f"worlds.{world_name}"] = spec
-
-                apworld_source.load()
-                if apworld.game in AutoWorldRegister.world_types:
-                    # world could fail to load at this point
-                    if apworld.world_version:
-                        AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
-
-                    assert apworld.path
-                    with ZipFile(apworld.path, "r") as zf:
-                        manifest = apworld.read_contents(zf)
-                    # version/compatible_version shouldn't be needed by world, makes it consistent with folder world
-                    manifest.pop("version", None)
-                    manifest.pop("compatible_version", None)
-                    AutoWorldRegister.world_types[apworld.game].manifest = manifest
-
-    load_apworlds()
-    del load_apworlds
-
-del apworlds
+# import all submodules to trigger AutoWorldRegister
+logger.info("Processing found worlds")
+_load_sources([source for source in world_sources if not lazy_worlds or source.name == "generic"])
 
 # snapshot the worlds under test (a copy, so tests reassigning world_types can't leak in), dropping the
 # force-loaded fixtures unless they were explicitly requested.
@@ -249,4 +529,4 @@ logger.info("Datapackage")
 network_data_package: DataPackage = {
     "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
 }
-
+_cache_data_packages(network_data_package["games"])
@@ -50,6 +50,10 @@ class APQuestWorld(World):
     # This defaults to "Menu", but you can change it by overriding origin_region_name.
     origin_region_name = "Overworld"
 
+    # Our generation steps only ever touch our own player's regions, items and rules, and only use self.random.
+    # This lets the generator run them at the same time as other worlds' steps if the host enables stage workers.
+    concurrent_stages = True
+
     # Our world class must have certain functions ("steps") that get called during generation.
     # The main ones are: create_regions, set_rules, create_items.
     # For better structure and readability, we put each of these in their own file.